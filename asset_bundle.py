@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+import mmap
+import os
+import struct
+import zlib
+
+# Single-file asset bundle for a whole decoded skin
+#
+# Extracting a firmware skin to thousands of PNGs spends most of its time on
+# per-file overhead. A bundle holds the decoded RGBA pixels of every asset in one
+# file, optionally zlib-compressed per entry, so a whole skin is written and read
+# back with a few large sequential I/O calls. The reader memory-maps the file:
+# opening one asset touches only the index and that asset's bytes.
+#
+# Layout (little-endian):
+#   header   magic "OVGB", version, reserved, entry count, index offset, index length
+#   data     stored pixel data of every entry, back to back
+#   index    per entry: width, height, source format, flags, name length,
+#            data offset, stored length, raw length, then the UTF-8 name
+# The index is written after the data so entries can be streamed in without
+# holding the skin in memory; the fixed-size header at offset 0 points to it.
+
+BUNDLE_MAGIC = b'OVGB'
+BUNDLE_VERSION = 1
+
+BUNDLE_HEADER = struct.Struct('<4sHHIQQ')
+BUNDLE_ENTRY = struct.Struct('<IIBBHQQQ')
+
+# Entry flags
+FLAG_ZLIB = 0x01
+
+# Source OVG format of each entry, so it can be re-encoded the same way
+BUNDLE_FORMATS = ["unknown", "raw_rgba", "rle_ovg"]
+
+class BundleEntry:
+    """Index record for one asset in a bundle"""
+    
+    def __init__(self, name, width, height, format_type, flags, offset, stored_length, raw_length):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.format_type = format_type
+        self.flags = flags
+        self.offset = offset
+        self.stored_length = stored_length
+        self.raw_length = raw_length
+    
+    @property
+    def compressed(self):
+        return bool(self.flags & FLAG_ZLIB)
+
+def pack_pixels(rgba_data, level=6):
+    """Compress pixel data for storage; returns (stored_data, flags)
+    
+    Data is stored as-is when level is 0 or zlib doesn't make it smaller.
+    """
+    if level > 0:
+        packed = zlib.compress(rgba_data, level)
+        if len(packed) < len(rgba_data):
+            return packed, FLAG_ZLIB
+    return rgba_data, 0
+
+def is_bundle(filename):
+    """True if filename is an asset bundle"""
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(BUNDLE_MAGIC)) == BUNDLE_MAGIC
+    except OSError:
+        return False
+
+class BundleWriter:
+    """Write assets one after another into a new bundle file
+    
+    Use as a context manager; the index and header are written on close, so a
+    bundle is only valid once the writer has been closed.
+    """
+    
+    def __init__(self, filename, level=6):
+        self.filename = filename
+        self.level = level
+        self.file = open(filename, 'wb', buffering=1 << 20)
+        self.file.write(bytes(BUNDLE_HEADER.size))
+        self.offset = BUNDLE_HEADER.size
+        self.entries = []
+        self.names = set()
+    
+    def add(self, name, rgba_data, width, height, format_type):
+        """Compress and append one asset"""
+        stored_data, flags = pack_pixels(rgba_data, self.level)
+        return self.add_packed(name, stored_data, flags, len(rgba_data), width, height, format_type)
+    
+    def add_packed(self, name, stored_data, flags, raw_length, width, height, format_type):
+        """Append data already prepared with pack_pixels(); returns its BundleEntry"""
+        if name in self.names:
+            raise ValueError(f"Duplicate asset name in bundle: {name}")
+        if format_type not in BUNDLE_FORMATS:
+            format_type = "unknown"
+        
+        entry = BundleEntry(name, width, height, format_type, flags, self.offset, len(stored_data), raw_length)
+        self.file.write(stored_data)
+        self.offset += len(stored_data)
+        self.entries.append(entry)
+        self.names.add(name)
+        return entry
+    
+    def close(self):
+        if self.file.closed:
+            return
+        
+        index = bytearray()
+        for entry in self.entries:
+            name = entry.name.encode('utf-8')
+            index += BUNDLE_ENTRY.pack(entry.width, entry.height, BUNDLE_FORMATS.index(entry.format_type),
+                                       entry.flags, len(name), entry.offset, entry.stored_length, entry.raw_length)
+            index += name
+        self.file.write(index)
+        
+        self.file.seek(0)
+        self.file.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, 0, len(self.entries),
+                                           self.offset, len(index)))
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class AssetBundle:
+    """Memory-mapped read access to a bundle
+    
+    Iterating yields BundleEntry records in the order they were written.
+    Uncompressed entries are returned as views into the mapping without copying.
+    """
+    
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files can't be mapped, and some filesystems don't support it
+            self.map = self.file.read()
+        self.entries = {}
+        try:
+            self.read_index()
+        except Exception:
+            self.close()
+            raise
+    
+    def read_index(self):
+        size = len(self.map)
+        if size < BUNDLE_HEADER.size:
+            raise ValueError(f"{self.filename} is too small to be an asset bundle")
+        
+        magic, version, _, count, index_offset, index_length = BUNDLE_HEADER.unpack_from(self.map, 0)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(f"{self.filename} is not an asset bundle")
+        if version != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {version} in {self.filename}")
+        if index_offset + index_length > size:
+            raise ValueError(f"Bundle index of {self.filename} is truncated")
+        
+        pos = index_offset
+        for _ in range(count):
+            if pos + BUNDLE_ENTRY.size > index_offset + index_length:
+                raise ValueError(f"Bundle index of {self.filename} is truncated")
+            (width, height, format_code, flags, name_length,
+             offset, stored_length, raw_length) = BUNDLE_ENTRY.unpack_from(self.map, pos)
+            pos += BUNDLE_ENTRY.size
+            name = bytes(self.map[pos:pos + name_length]).decode('utf-8')
+            pos += name_length
+            
+            if offset + stored_length > index_offset or format_code >= len(BUNDLE_FORMATS):
+                raise ValueError(f"Corrupt bundle entry {name} in {self.filename}")
+            self.entries[name] = BundleEntry(name, width, height, BUNDLE_FORMATS[format_code], flags,
+                                             offset, stored_length, raw_length)
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __iter__(self):
+        return iter(self.entries.values())
+    
+    def __contains__(self, name):
+        return name in self.entries
+    
+    def entry(self, name):
+        """Index record for name; raises KeyError if the bundle doesn't contain it"""
+        return self.entries[name]
+    
+    def read(self, name):
+        """Pixel data of one asset (name or BundleEntry); returns (rgba_data, width, height)"""
+        entry = name if isinstance(name, BundleEntry) else self.entries[name]
+        stored_data = memoryview(self.map)[entry.offset:entry.offset + entry.stored_length]
+        
+        if entry.compressed:
+            rgba_data = zlib.decompress(stored_data)
+            stored_data.release()
+        else:
+            rgba_data = stored_data
+        
+        if len(rgba_data) != entry.raw_length:
+            raise ValueError(f"Bundle entry {entry.name} decoded to {len(rgba_data)} bytes, "
+                             f"expected {entry.raw_length}")
+        return rgba_data, entry.width, entry.height
+    
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            try:
+                self.map.close()
+            except BufferError:
+                # Views returned by read() are still alive; the mapping is released with them
+                pass
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    from conversion_log import logger, configure_output
+    
+    parser = argparse.ArgumentParser(description='Inspect and extract OVG asset bundles')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    list_parser = commands.add_parser('list', help='List the assets in a bundle')
+    list_parser.add_argument('bundle', help='Bundle file')
+    
+    extract_parser = commands.add_parser('extract', help='Write one asset out as a PNG')
+    extract_parser.add_argument('bundle', help='Bundle file')
+    extract_parser.add_argument('name', help='Asset name (as shown by list)')
+    extract_parser.add_argument('output', nargs='?', help='Output PNG file (default: NAME with .png)')
+    
+    args = parser.parse_args()
+    configure_output()
+    
+    try:
+        bundle = AssetBundle(args.bundle)
+    except (OSError, ValueError) as e:
+        logger.error("✗ Cannot open bundle: %s", e)
+        sys.exit(1)
+    
+    with bundle:
+        if args.command == 'list':
+            print(f"{'Name':<48} {'Size':>9} {'Format':>9} {'Bytes':>10} {'Stored':>10}")
+            raw_total = stored_total = 0
+            for entry in bundle:
+                print(f"{entry.name:<48} {entry.width:>4}x{entry.height:<4} {entry.format_type:>9} "
+                      f"{entry.raw_length:>10} {entry.stored_length:>10}")
+                raw_total += entry.raw_length
+                stored_total += entry.stored_length
+            print(f"\n{len(bundle)} assets, {raw_total} bytes of pixels stored in {stored_total} bytes")
+        else:
+            from ovg_to_png import create_image_from_rgba
+            
+            if args.name not in bundle:
+                logger.error("✗ %s does not contain %s", args.bundle, args.name)
+                sys.exit(1)
+            output = args.output or os.path.splitext(os.path.basename(args.name))[0] + ".png"
+            rgba_data, width, height = bundle.read(args.name)
+            output = create_image_from_rgba(rgba_data, width, height, output)
+            del rgba_data
+            logger.info("✓ Extracted %s (%dx%d) to %s", args.name, width, height, output)
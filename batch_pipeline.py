@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+import threading
+import queue
+import time
+from conversion_log import logger, SUMMARY, emit_record, file_record
+
+# Pipelined batch conversion
+#
+# Each stage runs in its own thread and is connected to the next by a bounded
+# queue. While one file is being decoded the next is already being read and the
+# previous one encoded or written, so slow storage (USB sticks, network mounts)
+# and CPU work overlap. The bounded queues apply backpressure: a fast reader can
+# only get queue_size files ahead of the slowest stage, which keeps memory bounded.
+
+# Marks the end of the job stream on a queue
+END_OF_JOBS = object()
+
+class StageStats:
+    """Timing counters for one pipeline stage"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.failures = 0
+        self.busy_time = 0.0
+        self.wait_time = 0.0
+    
+    def utilisation(self, wall_time):
+        """Fraction of the pipeline wall time this stage spent working"""
+        if wall_time <= 0:
+            return 0.0
+        return self.busy_time / wall_time
+
+def run_stage(name, func, in_queue, out_queue, stats):
+    """Pull jobs from in_queue, apply func and pass them to out_queue"""
+    while True:
+        wait_start = time.perf_counter()
+        job = in_queue.get()
+        stats.wait_time += time.perf_counter() - wait_start
+        
+        if job is END_OF_JOBS:
+            out_queue.put(END_OF_JOBS)
+            return
+        
+        # Jobs that already failed upstream are passed through untouched
+        if job.get('error') is None:
+            start = time.perf_counter()
+            try:
+                func(job)
+            except Exception as e:
+                job['error'] = e
+                job['failed_stage'] = name
+                stats.failures += 1
+            stats.busy_time += time.perf_counter() - start
+            stats.items += 1
+        
+        out_queue.put(job)
+
+def run_pipeline(jobs, stages, queue_size=4):
+    """Run job dicts through a list of (name, func) stages concurrently
+    
+    Each func receives the job dict and updates it in place. Returns the finished
+    jobs in input order, the per-stage StageStats and the total wall time.
+    """
+    if queue_size < 1:
+        # queue.Queue treats 0 as unbounded, which would remove the backpressure
+        raise ValueError(f"queue_size must be at least 1, got {queue_size}")
+    
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    stats = [StageStats(name) for name, _ in stages]
+    
+    threads = []
+    for index, (name, func) in enumerate(stages):
+        thread = threading.Thread(target=run_stage, name=f"pipeline-{name}",
+                                  args=(name, func, queues[index], queues[index + 1], stats[index]),
+                                  daemon=True)
+        threads.append(thread)
+    
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    
+    # Feed from a separate thread so the collector below drains results while
+    # the first queue is full
+    def feed():
+        for index, job in enumerate(jobs):
+            job.setdefault('index', index)
+            job.setdefault('error', None)
+            queues[0].put(job)
+        queues[0].put(END_OF_JOBS)
+    
+    feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+    feeder.start()
+    
+    finished = []
+    while True:
+        job = queues[-1].get()
+        if job is END_OF_JOBS:
+            break
+        finished.append(job)
+    
+    wall_time = time.perf_counter() - start
+    feeder.join()
+    for thread in threads:
+        thread.join()
+    
+    finished.sort(key=lambda job: job['index'])
+    return finished, stats, wall_time
+
+def positive_int_argument(value):
+    """argparse type for counts such as --queue-size and --workers: an integer of at least 1"""
+    import argparse
+    
+    size = int(value)
+    if size < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {size}")
+    return size
+
+def run_serial(jobs, stages):
+    """Run job dicts through the same stages one job at a time
+    
+    Jobs are updated exactly as run_pipeline would, including 'error' and
+    'failed_stage', so callers can report both modes the same way.
+    """
+    finished = []
+    for index, job in enumerate(jobs):
+        job.setdefault('index', index)
+        job.setdefault('error', None)
+        for name, func in stages:
+            try:
+                func(job)
+            except Exception as e:
+                job['error'] = e
+                job['failed_stage'] = name
+                break
+        finished.append(job)
+    return finished
+
+def report_finished_jobs(finished):
+    """Log failed jobs and emit a JSON record for every job; returns the success count
+    
+    Jobs carry 'input' and 'output'; bundle jobs also carry the asset name as
+    'entry', which is used to name failures.
+    """
+    success_count = 0
+    for job in finished:
+        fields = {'entry': job['entry']} if 'entry' in job else {}
+        if job['error'] is None:
+            success_count += 1
+            emit_record(file_record(job['input'], job['output'], seconds=job['seconds'], **fields,
+                                    format=job['format'], width=job['width'], height=job['height'],
+                                    input_bytes=job['input_bytes'], output_bytes=job['output_bytes']))
+        else:
+            logger.error("✗ Failed to convert %s (%s): %s", job.get('entry', job['input']),
+                         job['failed_stage'], job['error'])
+            if 'format' in job:
+                fields['format'] = job['format']
+            emit_record(file_record(job['input'], job['output'], status="error", error=job['error'],
+                                    stage=job['failed_stage'], **fields))
+    return success_count
+
+def print_stage_report(stats, wall_time):
+    """Print per-stage utilisation so the bottleneck stage is easy to spot"""
+    logger.log(SUMMARY, "\nPipeline stage utilisation (wall time %.2fs):", wall_time)
+    logger.log(SUMMARY, f"  {'Stage':<10} {'Files':>6} {'Busy':>9} {'Idle':>9} {'Util':>6}")
+    for stage in stats:
+        logger.log(SUMMARY, f"  {stage.name:<10} {stage.items:>6} {stage.busy_time:>8.2f}s "
+                   f"{stage.wait_time:>8.2f}s {stage.utilisation(wall_time):>6.0%}")
+    
+    busiest = max(stats, key=lambda stage: stage.busy_time, default=None)
+    if busiest is not None and busiest.busy_time > 0:
+        logger.log(SUMMARY, "  Bottleneck: %s", busiest.name)
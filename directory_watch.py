@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import time
+
+# Directory change notification for watch mode
+#
+# On Linux the watcher uses inotify through ctypes, so it wakes up as soon as an
+# editor finishes writing a file. Elsewhere (or if inotify can't be set up) it
+# falls back to polling file modification times. DebouncedWatcher sits on top
+# and only reports a file once it has been quiet for the debounce interval, so a
+# burst of saves from an image editor becomes a single conversion.
+
+# inotify event masks (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event header: wd, mask, cookie, len
+INOTIFY_EVENT = struct.Struct('iIII')
+
+class InotifyWatcher:
+    """Report files written or moved into a directory using Linux inotify"""
+    
+    def __init__(self, directory, pattern="*"):
+        self.directory = directory
+        self.pattern = pattern
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+    
+    def poll(self, timeout):
+        """Wait up to timeout seconds; returns the set of changed file paths"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        
+        changed = set()
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(buffer):
+            _, mask, _, name_length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            name = buffer[offset:offset + name_length].rstrip(b'\0')
+            offset += name_length
+            
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; report everything and let the caller sort it out
+                changed.update(list_matching(self.directory, self.pattern))
+            elif name and fnmatch.fnmatch(os.fsdecode(name), self.pattern):
+                changed.add(os.path.join(self.directory, os.fsdecode(name)))
+        return changed
+    
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Report changed files by comparing modification times and sizes"""
+    
+    def __init__(self, directory, pattern="*", interval=0.5):
+        self.directory = directory
+        self.pattern = pattern
+        self.interval = interval
+        self.snapshot = self.scan()
+    
+    def scan(self):
+        state = {}
+        for path in list_matching(self.directory, self.pattern):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+    
+    def poll(self, timeout):
+        """Wait up to timeout seconds; returns the set of changed file paths"""
+        time.sleep(min(timeout, self.interval))
+        current = self.scan()
+        changed = {path for path, state in current.items() if self.snapshot.get(path) != state}
+        self.snapshot = current
+        return changed
+    
+    def close(self):
+        pass
+
+def list_matching(directory, pattern):
+    """Paths of regular files in directory whose names match pattern"""
+    with os.scandir(directory) as entries:
+        return [entry.path for entry in entries
+                if entry.is_file() and fnmatch.fnmatch(entry.name, pattern)]
+
+def create_watcher(directory, pattern="*", force_polling=False, poll_interval=0.5):
+    """Return an inotify watcher where available, otherwise a polling watcher"""
+    if not force_polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory, pattern)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory, pattern, poll_interval)
+
+class DebouncedWatcher:
+    """Collapse bursts of change events into one report per file
+    
+    A file is reported once no new event has arrived for it for debounce
+    seconds.
+    """
+    
+    def __init__(self, watcher, debounce=0.3):
+        self.watcher = watcher
+        self.debounce = debounce
+        self.pending = {}
+    
+    def wait(self, timeout=1.0):
+        """Return the files that have settled, waiting up to timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            if self.pending:
+                # Wake up in time for the earliest pending file to settle
+                next_due = min(self.pending.values()) + self.debounce
+                wait_time = max(0.0, min(deadline, next_due) - now)
+            else:
+                wait_time = max(0.0, deadline - now)
+            
+            for path in self.watcher.poll(wait_time):
+                self.pending[path] = time.monotonic()
+            
+            now = time.monotonic()
+            settled = {path for path, last_event in self.pending.items() if now - last_event >= self.debounce}
+            for path in settled:
+                del self.pending[path]
+            if settled or now >= deadline:
+                return settled
+    
+    def close(self):
+        self.watcher.close()
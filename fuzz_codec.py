@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+import io
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from ovg_codec import (compress_rgba_data, decode_rle_ovg_data, decode_ovg, encode_ovg,
+                       detect_data_format, build_palette_indices, compress_palette_data)
+from ovg_to_png import decode_rle_ovg_stream, decode_rle_ovg_file, decode_ovg_file, detect_file_format
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Deterministic fuzz / property harness for the RLE codec
+#
+# Every optimised encoder and decoder is cross-checked against the original
+# pixel-by-pixel implementations (compress_rgba_data(use_palette=False) and
+# decode_rle_ovg_stream) on seeded random and adversarial inputs. Format detection
+# and the file entry points are checked against a frozen copy of the original
+# detect_file_format / decode_ovg_file dispatch. Inputs include:
+#   - pixel buffers with few or many colours, runs of exactly 1-4, 127-130 and
+#     255-257 pixels, 128-pixel literal stretches and empty/single-pixel images
+#   - command streams that are random, truncated mid-packet, or valid
+#   - raw-RGBA lookalikes whose size is divisible by 4 and forms a square
+# Each case is generated from (seed, case number) alone, so any failure can be
+# replayed with --case. Implementations are timed while they are checked.
+
+# Run lengths that sit on either side of the encoder's decision points
+ADVERSARIAL_RUNS = [1, 2, 3, 4, 127, 128, 129, 130, 255, 256, 257, 384]
+
+class Mismatch(Exception):
+    """An implementation disagreed with the reference"""
+
+def random_colours(rng, count):
+    return [bytes(rng.randrange(256) for _ in range(4)) for _ in range(count)]
+
+def pixel_buffer(rng, max_pixels):
+    """Random or adversarial RGBA buffer; returns (description, rgba_data)"""
+    kind = rng.choice(['runs', 'runs', 'adversarial', 'literal', 'alternating', 'noise', 'edge'])
+    
+    if kind == 'edge':
+        choice = rng.randrange(4)
+        if choice == 0:
+            return "empty", b''
+        if choice == 1:
+            return "single pixel", random_colours(rng, 1)[0]
+        if choice == 2:
+            # Exactly one full literal packet followed by a run
+            colours = random_colours(rng, 130)
+            return "128 literal + run", b''.join(colours[:128]) + colours[128] * rng.choice([2, 3, 129])
+        # 256 vs 257 colours: either side of the palette threshold
+        count = rng.choice([256, 257])
+        colours = [struct.pack('>I', value) for value in rng.sample(range(1 << 32), count)]
+        return f"{count} distinct colours", b''.join(colours)
+    
+    if kind == 'noise':
+        count = rng.randrange(1, max_pixels + 1)
+        return "noise", bytes(rng.randrange(256) for _ in range(count * 4))
+    
+    if kind == 'alternating':
+        a, b = random_colours(rng, 2)
+        pattern = rng.choice([a + b, a + a + b, a + a + b + b, a + a + a + b])
+        repeats = rng.randrange(1, max(2, max_pixels // (len(pattern) // 4)))
+        return "alternating", pattern * repeats
+    
+    if kind == 'literal':
+        count = rng.randrange(1, max_pixels + 1)
+        colours = random_colours(rng, min(count, rng.choice([2, 16, 300])))
+        pixels = []
+        for _ in range(count):
+            # Avoid accidental runs of 3 so the buffer is mostly uncompressed packets
+            choices = [c for c in colours if pixels[-2:] != [c, c]] or colours
+            pixels.append(rng.choice(choices))
+        return "literal", b''.join(pixels)
+    
+    colours = random_colours(rng, rng.choice([1, 2, 3, 8, 64, 255, 256, 300]))
+    pixels = []
+    target = rng.randrange(0, max_pixels + 1)
+    while len(pixels) < target:
+        if kind == 'adversarial':
+            length = rng.choice(ADVERSARIAL_RUNS)
+        else:
+            length = rng.choice([1, 1, 2, 3, rng.randrange(1, 300)])
+        pixels.extend([rng.choice(colours)] * length)
+    return kind, b''.join(pixels)
+
+def command_stream(rng, max_pixels):
+    """Random, truncated or valid RLE command stream; returns (description, data)"""
+    kind = rng.choice(['random', 'valid', 'truncated', 'truncated', 'compressed-only'])
+    
+    if kind == 'random':
+        return "random bytes", bytes(rng.randrange(256) for _ in range(rng.randrange(0, 600)))
+    
+    if kind == 'compressed-only':
+        # Compressed commands whose pixel data may be cut short
+        data = bytearray()
+        for _ in range(rng.randrange(1, 20)):
+            data.append(0x80 | rng.randrange(128))
+            data.extend(random_colours(rng, 1)[0])
+        return kind, bytes(data[:len(data) - rng.randrange(0, 5)])
+    
+    _, rgba_data = pixel_buffer(rng, max_pixels)
+    data = bytes(compress_rgba_data(rgba_data, use_palette=False))
+    if kind == 'truncated' and data:
+        data = data[:rng.randrange(0, len(data))]
+    return kind, data
+
+def raw_lookalike(rng):
+    """Buffer whose size is divisible by 4 and whose pixel count forms a square"""
+    side = rng.randrange(2, 40)
+    pixels = side * rng.choice([side, side + 1])
+    alpha = rng.choice([[0, 255], [255], list(range(256))])
+    data = bytearray()
+    for _ in range(pixels):
+        data.extend(bytes(rng.randrange(256) for _ in range(3)))
+        data.append(rng.choice(alpha))
+    return f"raw lookalike {pixels} px", bytes(data)
+
+def reference_format(data):
+    """Frozen copy of the original detect_file_format, applied to file contents"""
+    if len(data) < 4:
+        return "unknown"
+    if len(data) % 4 != 0:
+        return "rle_ovg"
+    
+    pixels = len(data) // 4
+    side = int(math.sqrt(pixels))
+    if side * side == pixels or (side * (side + 1)) == pixels or ((side + 1) * side) == pixels:
+        pattern_count = 0
+        for i in range(0, min(100, len(data) - 4), 4):
+            if data[i + 3] in [0, 255]:
+                pattern_count += 1
+        if pattern_count >= 10:
+            return "raw_rgba"
+    return "rle_ovg"
+
+def reference_decode(data):
+    """Original decode_ovg_file dispatch: raw RGBA is returned as-is, anything else is RLE"""
+    if reference_format(data) == "raw_rgba":
+        return bytes(data)
+    return decode_rle_ovg_stream(io.BytesIO(data))
+
+def generate_case(seed, case, max_pixels):
+    """Input for one case, derived only from the seed and case number
+    
+    Returns (kind, description, data) where kind is 'pixels' for RGBA buffers to
+    encode, or 'commands' / 'raw' for OVG data to decode.
+    """
+    rng = random.Random(f"{seed}:{case}")
+    kind = rng.choice(['pixels', 'pixels', 'commands', 'raw'])
+    if kind == 'pixels':
+        description, data = pixel_buffer(rng, max_pixels)
+    elif kind == 'commands':
+        description, data = command_stream(rng, max_pixels)
+    else:
+        description, data = raw_lookalike(rng)
+    return kind, description, data
+
+class Harness:
+    """Runs implementations against the reference and keeps timing totals"""
+    
+    def __init__(self, use_numpy=True):
+        self.timings = {}
+        self.use_numpy = use_numpy and NUMPY_AVAILABLE
+        self.scratch = tempfile.NamedTemporaryFile(suffix='.bin', delete=False)
+        self.scratch.close()
+    
+    def timed(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        calls, total = self.timings.get(name, (0, 0.0))
+        self.timings[name] = (calls + 1, total + elapsed)
+        return result
+    
+    def expect(self, name, actual, expected):
+        if bytes(actual) != bytes(expected):
+            raise Mismatch(f"{name}: {len(actual)} bytes differ from reference {len(expected)} bytes")
+    
+    def check_encoders(self, rgba_data):
+        reference = self.timed("encode reference", compress_rgba_data, rgba_data, use_palette=False)
+        
+        self.expect("compress_rgba_data", self.timed("encode palette", compress_rgba_data, rgba_data), reference)
+        indexed = build_palette_indices(rgba_data)
+        if indexed is not None:
+            self.expect("compress_palette_data",
+                        self.timed("encode palette (forced)", compress_palette_data, rgba_data, *indexed), reference)
+        self.expect("encode_ovg(bytearray)",
+                    self.timed("encode_ovg bytearray", encode_ovg, bytearray(rgba_data), mode="rle"), reference)
+        self.expect("encode_ovg(memoryview)",
+                    self.timed("encode_ovg memoryview", encode_ovg, memoryview(rgba_data), mode="rle"), reference)
+        if self.use_numpy and rgba_data:
+            array = np.frombuffer(rgba_data, dtype=np.uint8).reshape(1, -1, 4)
+            self.expect("encode_ovg(ndarray)", self.timed("encode_ovg ndarray", encode_ovg, array, mode="rle"), reference)
+        
+        # Property: decoding the encoded stream gives the pixels back
+        self.expect("decode(encode(x))", decode_rle_ovg_data(bytes(reference)), rgba_data)
+    
+    def check_decoders(self, data):
+        reference = self.timed("decode reference", decode_rle_ovg_stream, io.BytesIO(data))
+        
+        self.expect("decode_rle_ovg_data(bytes)", self.timed("decode palette", decode_rle_ovg_data, data), reference)
+        self.expect("decode_rle_ovg_data(bytearray)", decode_rle_ovg_data(bytearray(data)), reference)
+        self.expect("decode_rle_ovg_data(memoryview)", decode_rle_ovg_data(memoryview(data)), reference)
+        rgba_data, _, _ = self.timed("decode_ovg", decode_ovg, data, 1, None, "rle_ovg")
+        self.expect("decode_ovg", rgba_data, reference)
+    
+    def check_file_paths(self, data):
+        """Format detection and the file and auto-detecting entry points must match
+        the original dispatch, including raw RGBA lookalikes"""
+        with open(self.scratch.name, 'wb') as f:
+            f.write(data)
+        
+        expected_format = reference_format(data)
+        for name, detected in [("detect_data_format", detect_data_format(data)),
+                               ("detect_file_format", detect_file_format(self.scratch.name))]:
+            if detected != expected_format:
+                raise Mismatch(f"{name}: {detected}, reference detected {expected_format}")
+        
+        reference = self.timed("decode file reference", reference_decode, data)
+        decoded, _ = self.timed("decode_ovg_file", decode_ovg_file, self.scratch.name)
+        self.expect("decode_ovg_file", decoded, reference)
+        # A width skips dimension detection, which needs at least one pixel
+        rgba_data, _, _ = self.timed("decode_ovg (detected)", decode_ovg, data, 1)
+        self.expect("decode_ovg (detected format)", rgba_data, reference)
+        
+        rle_reference = decode_rle_ovg_stream(io.BytesIO(data))
+        decoded, _ = decode_rle_ovg_file(self.scratch.name)
+        self.expect("decode_rle_ovg_file", decoded, rle_reference)
+        decoded, _ = self.timed("decode_rle_ovg_file stream", decode_rle_ovg_file, self.scratch.name,
+                                use_palette=False)
+        self.expect("decode_rle_ovg_file(use_palette=False)", decoded, rle_reference)
+    
+    def run_case(self, seed, case, max_pixels):
+        """Generate and check one case; returns its description"""
+        kind, description, data = generate_case(seed, case, max_pixels)
+        if kind == 'pixels':
+            self.check_encoders(data)
+        else:
+            self.check_decoders(data)
+            self.check_file_paths(data)
+        return f"{kind}/{description}"
+    
+    def print_timings(self):
+        print(f"\n  {'Implementation':<26} {'Calls':>7} {'Total':>9} {'Per call':>10}")
+        for name, (calls, total) in sorted(self.timings.items()):
+            print(f"  {name:<26} {calls:>7} {total:>8.3f}s {total / calls * 1e6:>8.1f}us")
+    
+    def close(self):
+        os.remove(self.scratch.name)
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Cross-check RLE codec implementations against the reference')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('-n', '--iterations', type=int, default=2000, help='Number of cases (default: 2000)')
+    parser.add_argument('--case', type=int, help='Replay a single case number for the given seed')
+    parser.add_argument('--max-pixels', type=int, default=2000, help='Largest generated image (default: 2000)')
+    parser.add_argument('--no-numpy', action='store_true', help='Skip NumPy array inputs')
+    parser.add_argument('--save-failure', metavar='FILE', help='Write the input of the first failing case to FILE')
+    args = parser.parse_args()
+    
+    harness = Harness(use_numpy=not args.no_numpy)
+    cases = [args.case] if args.case is not None else range(args.iterations)
+    print(f"Fuzzing RLE codecs: seed {args.seed}, {len(cases)} cases, up to {args.max_pixels} pixels")
+    
+    failures = 0
+    start = time.perf_counter()
+    try:
+        for case in cases:
+            try:
+                harness.run_case(args.seed, case, args.max_pixels)
+            except Mismatch as e:
+                failures += 1
+                _, description, data = generate_case(args.seed, case, args.max_pixels)
+                print(f"✗ Case {case} ({description}): {e}")
+                print(f"  Replay with: python3 fuzz_codec.py --seed {args.seed} --case {case}")
+                if args.save_failure and failures == 1:
+                    with open(args.save_failure, 'wb') as f:
+                        f.write(data)
+                    print(f"  Saved input to {args.save_failure}")
+    finally:
+        harness.close()
+    
+    harness.print_timings()
+    elapsed = time.perf_counter() - start
+    if failures:
+        print(f"\n✗ {failures}/{len(cases)} cases failed ({elapsed:.1f}s)")
+        sys.exit(1)
+    print(f"\n✅ All {len(cases)} cases matched the reference ({elapsed:.1f}s)")
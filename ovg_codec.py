@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+import functools
+import math
+import operator
+import re
+import struct
+from conversion_log import logger
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# In-memory OVG / RCD codec
+#
+# Everything here works on bytes-like objects (bytes, bytearray, memoryview,
+# C-contiguous NumPy arrays) and returns buffers, so build services can convert
+# assets without temp files. ovg_to_png.py and png_to_ovg.py are CLI wrappers
+# around these functions. PIL is only needed to pass PIL images to encode_ovg.
+
+# Largest run lookup table kept while decoding low-colour images
+PALETTE_MAX_ENTRIES = 1024
+# Images with at most this many distinct RGBA values are encoded via a palette
+PALETTE_MAX_COLOURS = 256
+# Matches a run of 3 or more identical palette indices (the shortest run worth compressing)
+PALETTE_RUN_PATTERN = re.compile(rb'(.)\1{2,}', re.DOTALL)
+
+# RCD330 logo.bin: raw BGRA pixels followed by a 4-byte XOR checksum
+RCD_LOGO_WIDTH = 800
+RCD_LOGO_HEIGHT = 480
+
+def detect_data_format(data):
+    """Detect if in-memory OVG data is RLE OVG or raw RGBA format"""
+    if len(data) < 4:
+        return "unknown"
+    
+    # Check if file size is divisible by 4 (RGBA pixels)
+    if len(data) % 4 != 0:
+        return "rle_ovg"  # Raw RGBA should be divisible by 4
+    
+    # Check for patterns that suggest raw RGBA
+    pixels = len(data) // 4
+    
+    # Check if it forms a reasonable square or near-square dimension
+    import math
+    side = int(math.sqrt(pixels))
+    if side * side == pixels or (side * (side + 1)) == pixels or ((side + 1) * side) == pixels:
+        # Could be raw RGBA if forms reasonable square dimensions
+        
+        # Check for repeating patterns typical of raw RGBA
+        pattern_count = 0
+        for i in range(0, min(100, len(data) - 4), 4):
+            # Check if RGBA values are reasonable (not RLE command bytes)
+            r, g, b, a = data[i:i+4]
+            if a in [0, 255]:  # Common alpha values
+                pattern_count += 1
+        
+        if pattern_count >= 10:  # If many pixels have typical alpha values
+            return "raw_rgba"
+    
+    return "rle_ovg"
+
+def decode_rle_ovg_data(data):
+    """Decode an in-memory RLE OVG stream, expanding runs through a palette lookup table
+    
+    Low-colour assets repeat the same handful of (command, RGBA) packets over and
+    over, so each expanded compressed run is cached and reused instead of being
+    rebuilt pixel by pixel. Output is identical to the streaming decoder.
+    """
+    
+    bytesOut = bytearray()
+    palette = {}
+    data_len = len(data)
+    pos = 0
+    
+    while pos < data_len:
+        cmd = data[pos]
+        pixels = (cmd & 0x7F) + 1
+        pos += 1
+        
+        if cmd & 0x80:
+            # Compressed run: one RGBA value repeated, looked up by packet
+            if pos + 4 > data_len:
+                break
+            
+            packet = int.from_bytes(data[pos - 1:pos + 4], 'big')
+            run = palette.get(packet)
+            if run is None:
+                run = bytes(data[pos:pos + 4]) * pixels
+                # Full-colour images would only bloat the table, so stop caching
+                if len(palette) < PALETTE_MAX_ENTRIES:
+                    palette[packet] = run
+            bytesOut += run
+            pos += 4
+        else:
+            # Uncompressed stream: copy whole pixels, dropping a truncated tail
+            end = pos + pixels * 4
+            chunk = data[pos:end]
+            bytesOut += chunk[:len(chunk) & ~3]
+            pos = end
+    
+    return bytesOut
+
+def auto_detect_dimensions(totalPixels, verbose=False):
+    """Auto-detect likely image dimensions using multiple strategies"""
+    
+    # Strategy 1: Perfect square
+    side = int(math.sqrt(totalPixels))
+    if side * side == totalPixels:
+        return side, side
+    
+    # Strategy 1.5: Near-perfect square (for raw RGBA data)
+    if abs(side * side - totalPixels) <= 2 * side:
+        # Check if it's close to a square
+        if side * (side + 1) == totalPixels:
+            return side, side + 1
+        elif (side + 1) * side == totalPixels:
+            return side + 1, side
+    
+    # Strategy 2: Find all possible factor pairs
+    factors = []
+    for i in range(1, int(math.sqrt(totalPixels)) + 1):
+        if totalPixels % i == 0:
+            width = totalPixels // i
+            height = i
+            factors.append((width, height, abs(width - height)))  # Include aspect ratio difference
+    
+    # Strategy 3: Score factor pairs by likelihood
+    scored_factors = []
+    for width, height, diff in factors:
+        score = 0
+        
+        # Prefer reasonable image sizes (not too thin/wide)
+        aspect_ratio = max(width, height) / min(width, height)
+        if aspect_ratio <= 4:  # Reasonable aspect ratio
+            score += 100
+        
+        # Prefer common resolutions and "nice" numbers
+        for dimension in [width, height]:
+            if dimension in [160, 200, 240, 256, 320, 400, 480, 640, 800, 1024]:
+                score += 20
+            if dimension % 8 == 0:  # Divisible by 8 (common for images)
+                score += 10
+            if dimension % 16 == 0:  # Divisible by 16 (even better)
+                score += 5
+        
+        # Prefer closer to square (but not mandatory)
+        if aspect_ratio <= 2:
+            score += 30
+        elif aspect_ratio <= 1.5:
+            score += 50
+        
+        # Prefer sizes that aren't too small or too large
+        if 50 <= min(width, height) <= 1000:
+            score += 40
+        
+        scored_factors.append((score, width, height))
+    
+    # Sort by score (highest first) and return best match
+    if scored_factors:
+        scored_factors.sort(reverse=True)
+        # Candidates show up with -v even when called through decode_ovg
+        log = logger.info if verbose else logger.debug
+        log("Top dimension candidates:")
+        for i, (score, w, h) in enumerate(scored_factors[:5]):
+            log("  %d. %dx%d (score: %d)", i+1, w, h, score)
+        _, best_width, best_height = scored_factors[0]
+        return best_width, best_height
+    
+    # Strategy 4: Fallback - try common aspect ratios
+    for ratio in [(1, 1), (4, 3), (3, 2), (16, 9), (2, 1)]:
+        width = int(math.sqrt(totalPixels * ratio[0] / ratio[1]))
+        height = totalPixels // width
+        if width * height <= totalPixels and width > 0 and height > 0:
+            return width, height
+    
+    # Final fallback
+    side = int(math.sqrt(totalPixels))
+    return side, totalPixels // side
+
+def encode_rle_command(is_compressed, pixel_count):
+    """Encode RLE command byte"""
+    # Pixel count is stored as count-1 (0-127 range for 1-128 pixels)
+    count_bits = pixel_count - 1
+    if count_bits > 127:
+        raise ValueError(f"Too many pixels in run: {pixel_count} (max 128)")
+    
+    if is_compressed:
+        # Set MSB to 1 for compressed
+        command = 0x80 | count_bits
+    else:
+        # MSB is 0 for uncompressed
+        command = count_bits
+    
+    return command
+
+def build_palette_indices(rgba_data, max_colours=PALETTE_MAX_COLOURS):
+    """Map each RGBA pixel to a uint8 palette index
+    
+    Returns (palette, indices) where palette is a list of 4-byte pixels and indices
+    is a bytes object with one entry per pixel, or None if the image uses more than
+    max_colours distinct values.
+    """
+    pixels = memoryview(rgba_data).cast('I')
+    
+    # Scan in chunks so full-colour images bail out early
+    colours = set()
+    for chunk_start in range(0, len(pixels), 65536):
+        colours.update(pixels[chunk_start:chunk_start + 65536])
+        if len(colours) > max_colours:
+            return None
+    
+    lookup = {colour: index for index, colour in enumerate(colours)}
+    palette = [struct.pack('=I', colour) for colour in colours]
+    indices = bytes(map(lookup.__getitem__, pixels))
+    return palette, indices
+
+def compress_palette_data(rgba_data, palette, indices):
+    """Compress palette-indexed RGBA data using RLE compression
+    
+    Runs of 3+ identical pixels are found with a single regex scan over the uint8
+    index array; everything between them is copied out as uncompressed packets.
+    The output is byte-for-byte what the pixel-by-pixel encoder produces.
+    """
+    compressed = bytearray()
+    literal_start = 0
+    
+    for match in PALETTE_RUN_PATTERN.finditer(indices):
+        run_start, run_end = match.span()
+        
+        # Pixels before this run never start a run of 3+, so they go out as-is
+        compressed.extend(pack_uncompressed_pixels(rgba_data, literal_start, run_start))
+        
+        # Compressed packets, split at the 128 pixel limit; a leftover of 1-2
+        # pixels is too short to compress and opens the next uncompressed stream
+        pixel = palette[indices[run_start]]
+        remaining = run_end - run_start
+        while remaining >= 3:
+            current_run = min(remaining, 128)
+            compressed.append(encode_rle_command(True, current_run))
+            compressed.extend(pixel)
+            remaining -= current_run
+        literal_start = run_end - remaining
+    
+    compressed.extend(pack_uncompressed_pixels(rgba_data, literal_start, len(indices)))
+    return compressed
+
+def pack_uncompressed_pixels(rgba_data, start, end):
+    """Pack pixels [start, end) as uncompressed RLE packets of up to 128 pixels"""
+    packed = bytearray()
+    for packet_start in range(start, end, 128):
+        packet_end = min(packet_start + 128, end)
+        packed.append(encode_rle_command(False, packet_end - packet_start))
+        packed.extend(rgba_data[packet_start * 4:packet_end * 4])
+    return packed
+
+def compress_rgba_data(rgba_data, use_palette=True):
+    """Compress RGBA data using RLE compression"""
+    if len(rgba_data) % 4 != 0:
+        raise ValueError("RGBA data length must be multiple of 4")
+    
+    if use_palette:
+        # Low-colour images (most gresfiles icons) take the indexed fast path
+        indexed = build_palette_indices(rgba_data)
+        if indexed is not None:
+            return compress_palette_data(rgba_data, *indexed)
+    
+    # The pixel-by-pixel loop compares slices, which is much faster on bytes
+    if not isinstance(rgba_data, (bytes, bytearray)):
+        rgba_data = bytes(rgba_data)
+    
+    compressed = bytearray()
+    i = 0
+    
+    while i < len(rgba_data):
+        # Get current pixel
+        current_pixel = rgba_data[i:i+4]
+        run_length = 1
+        
+        # Check how many consecutive identical pixels we have
+        j = i + 4
+        while j < len(rgba_data) and run_length < 128:
+            if rgba_data[j:j+4] == current_pixel:
+                run_length += 1
+                j += 4
+            else:
+                break
+        
+        # Decide whether to use RLE compression
+        if run_length >= 3:  # Compress runs of 3 or more
+            # Write compressed run
+            while run_length > 0:
+                current_run = min(run_length, 128)
+                command = encode_rle_command(True, current_run)
+                compressed.append(command)
+                compressed.extend(current_pixel)
+                run_length -= current_run
+        else:
+            # Write uncompressed pixels
+            # Look ahead to see how many non-repeating pixels we have
+            uncompressed_count = 1
+            k = i + 4
+            
+            while k < len(rgba_data) and uncompressed_count < 128:
+                next_pixel = rgba_data[k:k+4]
+                
+                # Check if next pixel starts a run of 3+
+                consecutive = 1
+                for l in range(k + 4, min(len(rgba_data), k + 12), 4):
+                    if rgba_data[l:l+4] == next_pixel:
+                        consecutive += 1
+                    else:
+                        break
+                
+                if consecutive >= 3:
+                    break  # Stop uncompressed run, let RLE handle the repetition
+                
+                uncompressed_count += 1
+                k += 4
+            
+            # Write uncompressed run
+            command = encode_rle_command(False, uncompressed_count)
+            compressed.append(command)
+            
+            for p in range(uncompressed_count):
+                pixel_offset = i + (p * 4)
+                compressed.extend(rgba_data[pixel_offset:pixel_offset+4])
+            
+            i = k
+            continue
+        
+        i = j
+    
+    return compressed
+
+def byte_view(data):
+    """Return a flat, zero-copy unsigned byte view of a bytes-like object
+    
+    Non-contiguous arrays can't be viewed flat and are copied once.
+    """
+    view = memoryview(data)
+    if not view.c_contiguous:
+        view = memoryview(view.tobytes())
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    return view
+
+def image_rgba_view(image):
+    """Raw RGBA bytes for a PIL image, NumPy array or bytes-like object
+    
+    Returns (rgba_data, width, height); width and height are None for flat
+    buffers whose shape isn't known.
+    """
+    if PIL_AVAILABLE and isinstance(image, Image.Image):
+        if image.mode != 'RGBA':
+            image = image.convert('RGBA')
+        width, height = image.size
+        return image.tobytes('raw', 'RGBA'), width, height
+    
+    view = memoryview(image)
+    if view.ndim == 3:
+        height, width, channels = view.shape
+        if channels != 4 or view.itemsize != 1:
+            raise ValueError(f"Expected an HxWx4 uint8 array, got shape {view.shape} ({view.format})")
+        return byte_view(view), width, height
+    
+    view = byte_view(view)
+    if len(view) % 4 != 0:
+        raise ValueError("RGBA data length must be multiple of 4")
+    return view, None, None
+
+def resolve_output_format(pixels, mode="auto"):
+    """Pick "rle" or "raw_rgba" for an image with the given pixel count"""
+    if mode not in ("auto", "rle", "raw_rgba"):
+        raise ValueError(f"Unknown OVG mode: {mode} (expected auto, rle or raw_rgba)")
+    if mode != "auto":
+        return mode
+    
+    # Check if dimensions suggest raw RGBA format
+    side = int(math.sqrt(pixels))
+    if side * side == pixels or (side * (side + 1)) == pixels or ((side + 1) * side) == pixels:
+        if pixels < 4000:  # Small images likely to be raw RGBA
+            return "raw_rgba"
+    return "rle"
+
+def decode_ovg(data, width=None, height=None, format_type=None):
+    """Decode OVG file contents held in memory
+    
+    Returns (rgba_data, width, height). Raw RGBA input is returned as a memoryview
+    of the input without copying; RLE input decodes into a new bytearray. Missing
+    dimensions are auto-detected from the pixel count.
+    """
+    view = byte_view(data)
+    if format_type is None:
+        format_type = detect_data_format(view)
+    
+    if format_type == "raw_rgba":
+        rgba_data = view[:len(view) & ~3]
+    else:
+        rgba_data = decode_rle_ovg_data(view)
+    
+    totalPixels = len(rgba_data) // 4
+    if width and not height:
+        height = totalPixels // width
+    elif height and not width:
+        width = totalPixels // height
+    elif not (width and height):
+        width, height = auto_detect_dimensions(totalPixels)
+    
+    return rgba_data, width, height
+
+def encode_ovg(image, mode="auto"):
+    """Encode an image as OVG file contents
+    
+    image is a PIL image, an HxWx4 uint8 NumPy array or flat RGBA bytes; mode is
+    "auto", "rle" or "raw_rgba". Arrays and buffers are read in place.
+    """
+    rgba_data, _, _ = image_rgba_view(image)
+    if resolve_output_format(len(rgba_data) // 4, mode) == "raw_rgba":
+        return bytes(rgba_data)
+    return bytes(compress_rgba_data(rgba_data))
+
+def rcd_checksum(bgra_data):
+    """XOR of every B, G, R and A byte, in that order"""
+    words = byte_view(bgra_data)
+    words = words[:len(words) & ~3].cast('I')
+    return struct.pack('=I', functools.reduce(operator.xor, words, 0))
+
+def decode_rcd(data, width=RCD_LOGO_WIDTH, height=RCD_LOGO_HEIGHT):
+    """Decode an RCD330 logo.bin held in memory
+    
+    Returns (rgba_data, width, height); the trailing checksum is ignored.
+    """
+    view = byte_view(data)
+    size = width * height * 4
+    if len(view) < size:
+        raise ValueError(f"Logo data too short: {len(view)} bytes for {width}x{height}")
+    
+    # Swap BGRA to RGBA with strided slice copies
+    rgba_data = bytearray(size)
+    rgba_data[0::4] = view[2:size:4]
+    rgba_data[1::4] = view[1:size:4]
+    rgba_data[2::4] = view[0:size:4]
+    rgba_data[3::4] = view[3:size:4]
+    return rgba_data, width, height
+
+def encode_rcd(image):
+    """Encode an image as RCD330 logo.bin contents (BGRA pixels + checksum)"""
+    rgba_data, _, _ = image_rgba_view(image)
+    size = len(rgba_data)
+    
+    bgra_data = bytearray(size)
+    bgra_data[0::4] = rgba_data[2:size:4]
+    bgra_data[1::4] = rgba_data[1:size:4]
+    bgra_data[2::4] = rgba_data[0:size:4]
+    bgra_data[3::4] = rgba_data[3:size:4]
+    return bytes(bgra_data) + rcd_checksum(bgra_data)
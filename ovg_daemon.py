@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from conversion_log import logger, configure_output
+
+# Long-running conversion daemon
+#
+# Running png_to_ovg.py on every save in a skin editor pays for Python startup,
+# the PIL import and a process spawn each time. The daemon keeps a pool of
+# worker processes with the codecs already imported and serves encode, decode
+# and inspect jobs over HTTP on localhost. Recently converted assets are kept in
+# an in-memory LRU so re-requesting the same file is a dictionary lookup.
+#
+# Endpoints (request body is the raw file contents):
+#   POST /encode?mode=auto|rle|raw_rgba    PNG in, OVG out
+#   POST /decode?width=W&height=H          OVG in, PNG out
+#   POST /inspect                          OVG in, JSON out
+#   GET  /status                           JSON pool and cache statistics
+# Image details are returned in X-Format, X-Width and X-Height headers.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8330
+
+# Largest request body the daemon will buffer; firmware assets are a few MB at most
+MAX_BODY_BYTES = 64 << 20
+
+def warm_worker():
+    """Pool initializer: import the codecs once per worker process"""
+    import signal
+    # Ctrl+C reaches the whole process group; let the main process shut the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    import ovg_codec
+    import ovg_to_png
+    from PIL import Image
+    Image.init()
+
+def encode_job(png_data, mode="auto"):
+    """Worker job: PNG bytes to OVG bytes"""
+    from PIL import Image, UnidentifiedImageError
+    from ovg_codec import encode_ovg, resolve_output_format
+    
+    try:
+        image = Image.open(io.BytesIO(png_data))
+    except UnidentifiedImageError:
+        raise ValueError("Request body is not a readable image")
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    width, height = image.size
+    format_type = resolve_output_format(width * height, mode)
+    return encode_ovg(image, mode=format_type), {'format': format_type, 'width': width, 'height': height}
+
+def decode_job(ovg_data, width=None, height=None):
+    """Worker job: OVG bytes to PNG bytes"""
+    from ovg_codec import decode_ovg, detect_data_format
+    from ovg_to_png import encode_image_from_rgba
+    
+    format_type = detect_data_format(ovg_data)
+    rgba_data, width, height = decode_ovg(ovg_data, width, height, format_type)
+    _, png_data = encode_image_from_rgba(rgba_data, width, height, "decoded.png")
+    return png_data, {'format': format_type, 'width': width, 'height': height}
+
+def inspect_job(ovg_data):
+    """Worker job: describe OVG bytes without producing an image"""
+    from ovg_codec import decode_ovg, detect_data_format
+    
+    format_type = detect_data_format(ovg_data)
+    rgba_data, width, height = decode_ovg(ovg_data, format_type=format_type)
+    info = {'format': format_type, 'width': width, 'height': height,
+            'pixels': len(rgba_data) // 4, 'bytes': len(ovg_data)}
+    return json.dumps(info).encode('utf-8'), info
+
+class ResultCache:
+    """Thread-safe LRU of recent job results keyed by operation, options and input hash"""
+    
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(operation, options, data):
+        return (operation, tuple(sorted(options.items())), hashlib.sha1(data).digest())
+    
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+    
+    def put(self, key, result):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+class ConversionDaemon:
+    """Worker pool plus result cache shared by all request threads"""
+    
+    JOBS = {'encode': encode_job, 'decode': decode_job, 'inspect': inspect_job}
+    
+    def __init__(self, workers=None, cache_size=64):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+        self.cache = ResultCache(cache_size)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.started = time.time()
+    
+    def warm_up(self):
+        """Start every worker now so the first request doesn't pay for it"""
+        futures = [self.pool.submit(time.sleep, 0.05) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+    
+    def run(self, operation, data, options):
+        """Run a job through the cache and worker pool; returns (payload, info)"""
+        with self.lock:
+            self.requests += 1
+        key = ResultCache.key(operation, options, data)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.pool.submit(self.JOBS[operation], data, **options).result()
+            self.cache.put(key, result)
+        return result
+    
+    def status(self):
+        return {
+            'uptime': round(time.time() - self.started, 1),
+            'workers': self.workers,
+            'requests': self.requests,
+            'cache_entries': len(self.cache.entries),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+        }
+    
+    def shutdown(self):
+        self.pool.shutdown()
+
+def parse_options(operation, query):
+    """Turn query string parameters into job keyword arguments"""
+    params = {name: values[-1] for name, values in parse_qs(query).items()}
+    if operation == 'encode':
+        return {'mode': params.get('mode', 'auto')}
+    if operation == 'decode':
+        return {'width': int(params['width']) if params.get('width') else None,
+                'height': int(params['height']) if params.get('height') else None}
+    return {}
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end for a ConversionDaemon"""
+    
+    server_version = "ovg-daemon/1"
+    protocol_version = "HTTP/1.1"
+    
+    def do_GET(self):
+        if urlparse(self.path).path == '/status':
+            self.send_payload(json.dumps(self.server.conversion_daemon.status()).encode('utf-8'), {},
+                              content_type='application/json')
+        else:
+            self.send_error(404, "Unknown endpoint")
+    
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        operation = url.path.strip('/')
+        if operation not in ConversionDaemon.JOBS:
+            self.send_error(404, "Unknown endpoint")
+            return
+        
+        # Never trust the length as sent: a negative value would read until EOF
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_error(400, "Invalid Content-Length")
+            return
+        if length > MAX_BODY_BYTES:
+            self.send_error(413, f"Request body larger than {MAX_BODY_BYTES} bytes")
+            return
+        data = self.rfile.read(length)
+        try:
+            options = parse_options(operation, url.query)
+            payload, info = self.server.conversion_daemon.run(operation, data, options)
+        except Exception as e:
+            logger.error("✗ %s failed: %s", operation, e)
+            self.send_error(400, str(e))
+            return
+        
+        content_type = {'encode': 'application/octet-stream', 'decode': 'image/png',
+                        'inspect': 'application/json'}[operation]
+        self.send_payload(payload, info, content_type)
+        logger.info("%s %d bytes -> %d bytes in %.1fms", operation, len(data), len(payload),
+                    (time.perf_counter() - start) * 1000)
+    
+    def send_payload(self, payload, info, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name in ('format', 'width', 'height'):
+            if info.get(name) is not None:
+                self.send_header(f'X-{name.title()}', str(info[name]))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, format, *args):
+        # Per-request lines are logged in do_POST; keep http.server quiet
+        pass
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, cache_size=64):
+    """Run the daemon until interrupted"""
+    daemon = ConversionDaemon(workers, cache_size)
+    daemon.warm_up()
+    server = ThreadingHTTPServer((host, port), DaemonRequestHandler)
+    server.conversion_daemon = daemon
+    logger.info("OVG daemon listening on http://%s:%d (%d workers)", host, port, daemon.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        server.server_close()
+        daemon.shutdown()
+
+def request(operation, data, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=30, **options):
+    """Client side: send one job to a running daemon; returns (payload, headers)"""
+    from urllib.request import Request, urlopen
+    from urllib.parse import urlencode
+    
+    query = urlencode({name: value for name, value in options.items() if value is not None})
+    url = f"http://{host}:{port}/{operation}" + (f"?{query}" if query else "")
+    method = 'GET' if operation == 'status' else 'POST'
+    req = Request(url, data=None if method == 'GET' else data, method=method,
+                  headers={'Content-Type': 'application/octet-stream'})
+    with urlopen(req, timeout=timeout) as response:
+        return response.read(), response.headers
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    from batch_pipeline import positive_int_argument
+    
+    # Connection options are accepted after every command
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--host', default=DEFAULT_HOST, help=f'Daemon address (default: {DEFAULT_HOST})')
+    common.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Daemon port (default: {DEFAULT_PORT})')
+    common.add_argument('-q', '--quiet', action='store_true', help='Only print errors')
+    
+    parser = argparse.ArgumentParser(description='OVG conversion daemon and client')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    serve_parser = commands.add_parser('serve', parents=[common], help='Run the daemon')
+    serve_parser.add_argument('--workers', type=positive_int_argument, help='Worker processes (default: CPU count)')
+    serve_parser.add_argument('--cache-size', type=int, default=64,
+                              help='Recent results kept in memory (default: 64, 0 disables)')
+    
+    encode_parser = commands.add_parser('encode', parents=[common], help='PNG to OVG through the daemon')
+    encode_parser.add_argument('input', help='Input PNG file')
+    encode_parser.add_argument('output', help='Output OVG file')
+    encode_parser.add_argument('--format', choices=['auto', 'rle', 'raw_rgba'], default='auto',
+                               help='Output format: auto (default), rle, or raw_rgba')
+    
+    decode_parser = commands.add_parser('decode', parents=[common], help='OVG to PNG through the daemon')
+    decode_parser.add_argument('input', help='Input OVG file')
+    decode_parser.add_argument('output', help='Output PNG file')
+    decode_parser.add_argument('-w', '--width', type=int, help='Specify image width')
+    decode_parser.add_argument('--height', type=int, help='Specify image height')
+    
+    inspect_parser = commands.add_parser('inspect', parents=[common], help='Show format and dimensions of an OVG file')
+    inspect_parser.add_argument('input', help='Input OVG file')
+    
+    commands.add_parser('status', parents=[common], help='Show daemon pool and cache statistics')
+    
+    args = parser.parse_args()
+    configure_output(quiet=args.quiet)
+    
+    if args.command == 'serve':
+        serve(args.host, args.port, args.workers, args.cache_size)
+        sys.exit(0)
+    
+    data = b''
+    if args.command in ('encode', 'decode', 'inspect'):
+        with open(args.input, 'rb') as f:
+            data = f.read()
+    
+    options = {}
+    if args.command == 'encode':
+        options = {'mode': args.format}
+    elif args.command == 'decode':
+        options = {'width': args.width, 'height': args.height}
+    
+    from urllib.error import HTTPError
+    try:
+        start = time.perf_counter()
+        payload, headers = request(args.command, data, args.host, args.port, **options)
+    except HTTPError as e:
+        logger.error("✗ Daemon rejected %s: %s", args.input if data else args.command, e.reason)
+        sys.exit(1)
+    except OSError as e:
+        logger.error("✗ Could not reach daemon at %s:%d: %s", args.host, args.port, e)
+        sys.exit(1)
+    
+    if args.command in ('inspect', 'status'):
+        print(json.dumps(json.loads(payload), indent=2))
+    else:
+        with open(args.output, 'wb') as f:
+            f.write(payload)
+        logger.info("✓ Created %s (%s, %sx%s) in %.1fms", args.output, headers.get('X-Format'),
+                    headers.get('X-Width'), headers.get('X-Height'), (time.perf_counter() - start) * 1000)
@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 import struct
-import math
+import io
+import time
+from conversion_log import (logger, add_output_arguments, configure_output, emit_record, flush_records,
+                            file_record, report_batch_summary, read_file, write_file)
+from profiling import add_profile_arguments, run_profiled, length_of, result_length_of
+import ovg_codec
+from ovg_codec import detect_data_format, decode_rle_ovg_data, decode_ovg, auto_detect_dimensions
+from asset_bundle import BundleWriter, pack_pixels
 try:
     from PIL import Image
     PIL_AVAILABLE = True
@@ -31,126 +38,164 @@ def create_bmp_header(width, height, bits_per_pixel=24):
 
 def detect_file_format(filename):
     """Detect if file is RLE OVG or raw RGBA format"""
-    with open(filename, "rb") as file:
-        data = file.read()
-        
-    if len(data) < 4:
-        return "unknown"
-    
-    # Check if file size is divisible by 4 (RGBA pixels)
-    if len(data) % 4 != 0:
-        return "rle_ovg"  # Raw RGBA should be divisible by 4
+    data = read_file(filename)
     
-    # Check for patterns that suggest raw RGBA
-    pixels = len(data) // 4
-    
-    # Check if it forms a reasonable square or near-square dimension
-    import math
-    side = int(math.sqrt(pixels))
-    if side * side == pixels or (side * (side + 1)) == pixels or ((side + 1) * side) == pixels:
-        # Could be raw RGBA if forms reasonable square dimensions
-        
-        # Check for repeating patterns typical of raw RGBA
-        pattern_count = 0
-        for i in range(0, min(100, len(data) - 4), 4):
-            # Check if RGBA values are reasonable (not RLE command bytes)
-            r, g, b, a = data[i:i+4]
-            if a in [0, 255]:  # Common alpha values
-                pattern_count += 1
-        
-        if pattern_count >= 10:  # If many pixels have typical alpha values
-            return "raw_rgba"
-    
-    return "rle_ovg"
+    return detect_data_format(data)
 
 def decode_ovg_file(filename):
     """Decode OVG file using the RLE format or raw RGBA"""
     
     format_type = detect_file_format(filename)
-    print(f"Detected format: {format_type}")
+    logger.info("Detected format: %s", format_type)
     
     if format_type == "raw_rgba":
         return decode_raw_rgba_file(filename)
     else:
         return decode_rle_ovg_file(filename)
 
+def decode_ovg_data(data, width=None, height=None, format_type=None):
+    """Decode in-memory OVG data with ovg_codec.decode_ovg, logging what was found
+    
+    Returns (rgba_data, width, height). Raw RGBA input comes back as a zero-copy
+    view of data; missing dimensions are calculated or auto-detected.
+    """
+    
+    if format_type is None:
+        format_type = detect_data_format(data)
+    logger.info("Detected format: %s", format_type)
+    
+    given_width, given_height = width, height
+    rgba_data, width, height = decode_ovg(data, width, height, format_type)
+    
+    if format_type == "raw_rgba":
+        logger.info("Raw RGBA data contains %d pixels", len(rgba_data) // 4)
+    else:
+        logger.info("Image data contains %d pixels", len(rgba_data) // 4)
+    
+    if given_width and given_height:
+        logger.info("Using specified dimensions: %dx%d", width, height)
+    elif given_width or given_height:
+        logger.info("Calculated dimensions: %dx%d", width, height)
+    else:
+        logger.info("Auto-detected dimensions: %dx%d", width, height)
+    
+    return rgba_data, width, height
+
 def decode_raw_rgba_file(filename):
     """Decode raw RGBA file"""
-    with open(filename, "rb") as file:
-        data = file.read()
+    data = read_file(filename)
     
     pixels = len(data) // 4
-    print(f"Raw RGBA data contains {pixels} pixels")
+    logger.info("Raw RGBA data contains %d pixels", pixels)
     return bytearray(data), pixels
 
-def decode_rle_ovg_file(filename):
+def decode_rle_ovg_file(filename, use_palette=True):
     """Decode OVG file using the RLE format"""
     
-    bytesOut = bytearray()
+    if use_palette:
+        bytesOut = decode_rle_ovg_data(read_file(filename))
+        
+        totalPixels = int(len(bytesOut) / 4)
+        logger.info("Image data contains %d pixels", totalPixels)
+        
+        return bytesOut, totalPixels
     
     with open(filename, "rb") as file:
-        # Read out the command block (1 byte)
-        cmd = file.read(1)
+        bytesOut = decode_rle_ovg_stream(file)
+    
+    totalPixels = int(len(bytesOut) / 4)
+    logger.info("Image data contains %d pixels", totalPixels)
+    
+    return bytesOut, totalPixels
+
+def decode_rle_ovg_stream(file):
+    """Decode an RLE OVG stream pixel by pixel from a binary file object
+    
+    This is the original reference decoder; decode_rle_ovg_data is the fast path
+    and must produce identical output (see fuzz_codec.py).
+    """
+    
+    bytesOut = bytearray()
+    
+    # Read out the command block (1 byte)
+    cmd = file.read(1)
+    
+    while cmd:
+        # Take the byte and represent it as a binary string
+        cmd_bin = binary_repr(ord(cmd), 8)
+        # Read the most significant binary bit to see what the RLE is up to
+        compression_flag = cmd_bin[0]
         
-        while cmd:
-            # Take the byte and represent it as a binary string
-            cmd_bin = binary_repr(ord(cmd), 8)
-            # Read the most significant binary bit to see what the RLE is up to
-            compression_flag = cmd_bin[0]
+        # 1 is compressed, 0 is single pixel
+        if compression_flag == "1":
+            # Compressed pixels
+            pixels = (int(cmd_bin[1:8], 2) + 1)
             
-            # 1 is compressed, 0 is single pixel
-            if compression_flag == "1":
-                # Compressed pixels
-                pixels = (int(cmd_bin[1:8], 2) + 1)
-                
-                # Read the pixel data (RGBA)
+            # Read the pixel data (RGBA)
+            pixel_data = file.read(4)
+            if len(pixel_data) < 4:
+                break
+            
+            rPixel, gPixel, bPixel, aPixel = pixel_data
+            
+            # Add repeated pixels
+            for x in range(pixels):
+                bytesOut.append(rPixel)
+                bytesOut.append(gPixel)
+                bytesOut.append(bPixel)
+                bytesOut.append(aPixel)
+            
+            # Read next command block
+            cmd = file.read(1)
+        else:
+            # Uncompressed stream follows
+            pixels = (int(cmd_bin[1:8], 2) + 1)
+            
+            # Read individual pixels
+            for x in range(pixels):
                 pixel_data = file.read(4)
                 if len(pixel_data) < 4:
                     break
-                    
-                rPixel, gPixel, bPixel, aPixel = pixel_data
-                
-                # Add repeated pixels
-                for x in range(pixels):
-                    bytesOut.append(rPixel)
-                    bytesOut.append(gPixel)
-                    bytesOut.append(bPixel)
-                    bytesOut.append(aPixel)
-                
-                # Read next command block
-                cmd = file.read(1)
-            else:
-                # Uncompressed stream follows
-                pixels = (int(cmd_bin[1:8], 2) + 1)
-                
-                # Read individual pixels
-                for x in range(pixels):
-                    pixel_data = file.read(4)
-                    if len(pixel_data) < 4:
-                        break
-                    
-                    rPixel, gPixel, bPixel, aPixel = pixel_data
-                    bytesOut.append(rPixel)
-                    bytesOut.append(gPixel)
-                    bytesOut.append(bPixel)
-                    bytesOut.append(aPixel)
                 
-                # Read next command block
-                cmd = file.read(1)
-    
-    totalPixels = int(len(bytesOut) / 4)
-    print(f"Image data contains {totalPixels} pixels")
+                rPixel, gPixel, bPixel, aPixel = pixel_data
+                bytesOut.append(rPixel)
+                bytesOut.append(gPixel)
+                bytesOut.append(bPixel)
+                bytesOut.append(aPixel)
+            
+            # Read next command block
+            cmd = file.read(1)
     
-    return bytesOut, totalPixels
+    return bytesOut
 
 def create_image_from_rgba(rgba_data, width, height, output_file):
-    """Create image file from RGBA data (PNG if PIL available, BMP otherwise)"""
+    """Create image file from RGBA data (PNG if PIL available, BMP otherwise)
+    
+    Returns the name of the file written, which switches to .bmp without PIL.
+    """
+    
+    output_file, image_data = encode_image_from_rgba(rgba_data, width, height, output_file)
+    write_file(output_file, image_data)
+    logger.info("✓ Created %s: %s", image_kind(output_file), output_file)
+    return output_file
+
+def image_kind(output_file):
+    """Human-readable image type for an output filename"""
+    return "PNG" if output_file.endswith('.png') else "BMP"
+
+def encode_image_from_rgba(rgba_data, width, height, output_file):
+    """Encode RGBA data to image file bytes (PNG if PIL available, BMP otherwise)
+    
+    Returns (output_file, image_data); output_file switches to .bmp when PNG
+    output isn't possible.
+    """
     
     if PIL_AVAILABLE and output_file.endswith('.png'):
         # Create PNG using PIL
         image = Image.frombytes('RGBA', (width, height), bytes(rgba_data), 'raw', 'RGBA')
-        image.save(output_file)
-        print(f"✓ Created PNG: {output_file}")
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return output_file, buffer.getvalue()
     else:
         # Create BMP file
         if output_file.endswith('.png'):
@@ -180,100 +225,23 @@ def create_image_from_rgba(rgba_data, width, height, output_file):
         while len(bgr_data) < expected_size:
             bgr_data.extend([0, 0, 0])
         
-        # Write BMP file
+        # Assemble BMP file
         row_size = ((width * 24 + 31) // 32) * 4
         padding = row_size - (width * 3)
         
-        with open(output_file, 'wb') as f:
-            f.write(bmp_header)
-            
-            # Write rows bottom to top (BMP format)
-            for y in range(height - 1, -1, -1):
-                row_start = y * width * 3
-                row_end = row_start + width * 3
-                f.write(bgr_data[row_start:row_end])
-                
-                # Add padding
-                if padding > 0:
-                    f.write(b'\x00' * padding)
-        
-        print(f"✓ Created BMP: {output_file}")
-
-def auto_detect_dimensions(totalPixels, verbose=False):
-    """Auto-detect likely image dimensions using multiple strategies"""
-    
-    # Strategy 1: Perfect square
-    side = int(math.sqrt(totalPixels))
-    if side * side == totalPixels:
-        return side, side
-    
-    # Strategy 1.5: Near-perfect square (for raw RGBA data)
-    if abs(side * side - totalPixels) <= 2 * side:
-        # Check if it's close to a square
-        if side * (side + 1) == totalPixels:
-            return side, side + 1
-        elif (side + 1) * side == totalPixels:
-            return side + 1, side
-    
-    # Strategy 2: Find all possible factor pairs
-    factors = []
-    for i in range(1, int(math.sqrt(totalPixels)) + 1):
-        if totalPixels % i == 0:
-            width = totalPixels // i
-            height = i
-            factors.append((width, height, abs(width - height)))  # Include aspect ratio difference
-    
-    # Strategy 3: Score factor pairs by likelihood
-    scored_factors = []
-    for width, height, diff in factors:
-        score = 0
-        
-        # Prefer reasonable image sizes (not too thin/wide)
-        aspect_ratio = max(width, height) / min(width, height)
-        if aspect_ratio <= 4:  # Reasonable aspect ratio
-            score += 100
-        
-        # Prefer common resolutions and "nice" numbers
-        for dimension in [width, height]:
-            if dimension in [160, 200, 240, 256, 320, 400, 480, 640, 800, 1024]:
-                score += 20
-            if dimension % 8 == 0:  # Divisible by 8 (common for images)
-                score += 10
-            if dimension % 16 == 0:  # Divisible by 16 (even better)
-                score += 5
+        bmp_data = bytearray(bmp_header)
         
-        # Prefer closer to square (but not mandatory)
-        if aspect_ratio <= 2:
-            score += 30
-        elif aspect_ratio <= 1.5:
-            score += 50
-        
-        # Prefer sizes that aren't too small or too large
-        if 50 <= min(width, height) <= 1000:
-            score += 40
+        # Write rows bottom to top (BMP format)
+        for y in range(height - 1, -1, -1):
+            row_start = y * width * 3
+            row_end = row_start + width * 3
+            bmp_data.extend(bgr_data[row_start:row_end])
+            
+            # Add padding
+            if padding > 0:
+                bmp_data.extend(b'\x00' * padding)
         
-        scored_factors.append((score, width, height))
-    
-    # Sort by score (highest first) and return best match
-    if scored_factors:
-        scored_factors.sort(reverse=True)
-        if verbose:
-            print(f"Top dimension candidates:")
-            for i, (score, w, h) in enumerate(scored_factors[:5]):
-                print(f"  {i+1}. {w}x{h} (score: {score})")
-        _, best_width, best_height = scored_factors[0]
-        return best_width, best_height
-    
-    # Strategy 4: Fallback - try common aspect ratios
-    for ratio in [(1, 1), (4, 3), (3, 2), (16, 9), (2, 1)]:
-        width = int(math.sqrt(totalPixels * ratio[0] / ratio[1]))
-        height = totalPixels // width
-        if width * height <= totalPixels and width > 0 and height > 0:
-            return width, height
-    
-    # Final fallback
-    side = int(math.sqrt(totalPixels))
-    return side, totalPixels // side
+        return output_file, bytes(bmp_data)
 
 def discover_image_size(rgba_data, totalPixels, width_min=35, width_max=400, width_step=1):
     """Interactive image size discovery"""
@@ -310,105 +278,237 @@ def discover_image_size(rgba_data, totalPixels, width_min=35, width_max=400, wid
         else:
             current_width += width_step
 
-def convert_directory(directory_path, output_directory, width=None, height=None, verbose=False, file_pattern="*.bin"):
-    """Convert all OVG files in a directory"""
+def convert_directory(directory_path, output_directory, width=None, height=None, verbose=False,
+                      file_pattern="*.bin", pipelined=False, queue_size=4, bundle_file=None, bundle_level=6):
+    """Convert all OVG files in a directory
+    
+    With bundle_file, the decoded pixels of every file are written into that one
+    asset bundle instead of separate PNGs, and output_directory is not used.
+    verbose is kept for existing callers; dimension detection details are logged
+    at debug level, which configure_output(verbose=True) enables.
+    """
     import os
     import glob
     
     if not os.path.isdir(directory_path):
-        print(f"Error: {directory_path} is not a directory")
+        logger.error("Error: %s is not a directory", directory_path)
         return False
     
     # Create output directory if it doesn't exist
-    if not os.path.exists(output_directory):
-        os.makedirs(output_directory)
-        print(f"Created output directory: {output_directory}")
-    elif not os.path.isdir(output_directory):
-        print(f"Error: {output_directory} exists but is not a directory")
-        return False
+    if bundle_file is None:
+        if not os.path.exists(output_directory):
+            os.makedirs(output_directory)
+            logger.info("Created output directory: %s", output_directory)
+        elif not os.path.isdir(output_directory):
+            logger.error("Error: %s exists but is not a directory", output_directory)
+            return False
     
     # Find all matching files
     search_pattern = os.path.join(directory_path, file_pattern)
     files = glob.glob(search_pattern)
     
     if not files:
-        print(f"No files matching '{file_pattern}' found in {directory_path}")
+        logger.error("No files matching '%s' found in %s", file_pattern, directory_path)
         return False
     
-    print(f"Found {len(files)} files to convert in {directory_path}")
-    print(f"Output directory: {output_directory}")
+    logger.info("Found %d files to convert in %s", len(files), directory_path)
+    
+    if bundle_file:
+        logger.info("Output bundle: %s", bundle_file)
+        return convert_files_to_bundle(sorted(files), bundle_file, width, height, bundle_level,
+                                       pipelined, queue_size)
+    
+    logger.info("Output directory: %s", output_directory)
+    
+    if pipelined:
+        return convert_files_pipelined(sorted(files), output_directory, width, height, queue_size)
+    
     success_count = 0
     
     for file_path in sorted(files):
         try:
-            print(f"\n--- Converting {os.path.basename(file_path)} ---")
+            logger.info("\n--- Converting %s ---", os.path.basename(file_path))
             
             # Generate output filename in the output directory
-            base_name = os.path.splitext(os.path.basename(file_path))[0]
-            if width and height:
-                output_name = f"{base_name}_decoded_{width}x{height}.png"
-            else:
-                output_name = f"{base_name}_decoded.png"
-            output_path = os.path.join(output_directory, output_name)
+            output_path = os.path.join(output_directory, decoded_output_name(file_path, width, height))
             
             if convert_single_file(file_path, output_path, width=width, height=height, verbose=verbose):
                 success_count += 1
         except Exception as e:
-            print(f"✗ Failed to convert {file_path}: {e}")
+            logger.error("✗ Failed to convert %s: %s", file_path, e)
     
-    print(f"\n✅ Successfully converted {success_count}/{len(files)} files")
+    report_batch_summary(success_count, len(files))
+    return success_count > 0
+
+def decoded_output_name(file_path, width=None, height=None):
+    """Output PNG name for an OVG file converted as part of a directory"""
+    import os
+    
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    if width and height:
+        return f"{base_name}_decoded_{width}x{height}.png"
+    return f"{base_name}_decoded.png"
+
+def convert_files_pipelined(files, output_directory, width=None, height=None, queue_size=4):
+    """Convert OVG files with overlapping read, decode, encode and write stages"""
+    import os
+    from batch_pipeline import run_pipeline, report_finished_jobs, print_stage_report
+    
+    def read_stage(job):
+        job['start'] = time.perf_counter()
+        job['data'] = read_file(job['input'])
+        job['input_bytes'] = len(job['data'])
+    
+    def decode_stage(job):
+        logger.info("\n--- Converting %s ---", os.path.basename(job['input']))
+        data = job.pop('data')
+        job['format'] = detect_data_format(data)
+        job['rgba'], job['width'], job['height'] = decode_ovg_data(data, width, height, job['format'])
+    
+    def encode_stage(job):
+        job['output'], job['image'] = encode_image_from_rgba(job.pop('rgba'), job['width'], job['height'],
+                                                             job['output'])
+    
+    def write_stage(job):
+        image_data = job.pop('image')
+        write_file(job['output'], image_data)
+        job['output_bytes'] = len(image_data)
+        job['seconds'] = time.perf_counter() - job['start']
+        logger.info("✓ Created %s: %s", image_kind(job['output']), job['output'])
+    
+    jobs = [{'input': file_path,
+             'output': os.path.join(output_directory, decoded_output_name(file_path, width, height))}
+            for file_path in files]
+    stages = [("read", read_stage), ("decode", decode_stage), ("encode", encode_stage), ("write", write_stage)]
+    finished, stats, wall_time = run_pipeline(jobs, stages, queue_size=queue_size)
+    
+    success_count = report_finished_jobs(finished)
+    report_batch_summary(success_count, len(files))
+    print_stage_report(stats, wall_time)
+    return success_count > 0
+
+def convert_files_to_bundle(files, bundle_file, width=None, height=None, level=6,
+                            pipelined=False, queue_size=4):
+    """Decode OVG files into one asset bundle, entries named after the input files"""
+    import os
+    from batch_pipeline import run_pipeline, run_serial, report_finished_jobs, print_stage_report
+    
+    def read_stage(job):
+        job['start'] = time.perf_counter()
+        job['data'] = read_file(job['input'])
+        job['input_bytes'] = len(job['data'])
+    
+    def decode_stage(job):
+        logger.info("\n--- Converting %s ---", job['entry'])
+        data = job.pop('data')
+        job['format'] = detect_data_format(data)
+        job['rgba'], job['width'], job['height'] = decode_ovg_data(data, width, height, job['format'])
+    
+    def compress_stage(job):
+        rgba_data = job.pop('rgba')
+        job['raw_bytes'] = len(rgba_data)
+        job['stored'], job['flags'] = pack_pixels(rgba_data, level)
+    
+    def write_stage(job):
+        stored_data = job.pop('stored')
+        bundle.add_packed(job['entry'], stored_data, job['flags'], job['raw_bytes'], job['width'], job['height'],
+                          job['format'])
+        job['output_bytes'] = len(stored_data)
+        job['seconds'] = time.perf_counter() - job['start']
+        logger.info("✓ Added %s to bundle (%dx%d, %d bytes)", job['entry'], job['width'], job['height'],
+                    len(stored_data))
+    
+    jobs = [{'input': file_path, 'output': bundle_file, 'entry': os.path.basename(file_path)}
+            for file_path in files]
+    stages = [("read", read_stage), ("decode", decode_stage), ("compress", compress_stage), ("write", write_stage)]
+    
+    # Create the bundle's directory if it doesn't exist, like --output-dir
+    try:
+        bundle_directory = os.path.dirname(bundle_file)
+        if bundle_directory and not os.path.isdir(bundle_directory):
+            os.makedirs(bundle_directory)
+            logger.info("Created output directory: %s", bundle_directory)
+        bundle = BundleWriter(bundle_file, level)
+    except OSError as e:
+        logger.error("Error: cannot write bundle %s: %s", bundle_file, e)
+        return False
+    
+    with bundle:
+        if pipelined:
+            finished, stats, wall_time = run_pipeline(jobs, stages, queue_size=queue_size)
+        else:
+            finished = run_serial(jobs, stages)
+    
+    success_count = report_finished_jobs(finished)
+    logger.info("✓ Wrote bundle %s: %d assets, %d bytes", bundle_file, len(bundle.entries),
+                os.path.getsize(bundle_file))
+    report_batch_summary(success_count, len(files))
+    if pipelined:
+        print_stage_report(stats, wall_time)
     return success_count > 0
 
 def convert_single_file(filename, output_name=None, width=None, height=None, discover_size=False, verbose=False):
-    """Convert a single OVG file to PNG"""
+    """Convert a single OVG file to PNG
+    
+    verbose is kept for existing callers; see convert_directory.
+    """
+    import os
+    
+    start = time.perf_counter()
+    format_type = None
     try:
-        print(f"Converting {filename}...")
-        rgba_data, totalPixels = decode_ovg_file(filename)
+        logger.info("Converting %s...", filename)
+        data = read_file(filename)
+        format_type = detect_data_format(data)
+        rgba_data, width, height = decode_ovg_data(data, width, height, format_type)
         
         if discover_size:
             # Run interactive size discovery
-            discover_image_size(rgba_data, totalPixels)
+            discover_image_size(rgba_data, len(rgba_data) // 4)
             return True
         
-        # Determine dimensions
-        if width and height:
-            # Use provided dimensions
-            print(f"Using specified dimensions: {width}x{height}")
-        elif width and not height:
-            # Calculate height from width
-            height = totalPixels // width
-            print(f"Calculated dimensions: {width}x{height}")
-        elif height and not width:
-            # Calculate width from height
-            width = totalPixels // height
-            print(f"Calculated dimensions: {width}x{height}")
-        else:
-            # Auto-detect dimensions using multiple strategies
-            width, height = auto_detect_dimensions(totalPixels, verbose=verbose)
-            print(f"Auto-detected dimensions: {width}x{height}")
-        
         # Generate output filename
         if output_name is None:
-            import os
             base_name = os.path.splitext(os.path.basename(filename))[0]
             output_name = f"{base_name}_decoded_{width}x{height}.png"
         
         # Create PNG
-        create_image_from_rgba(rgba_data, width, height, output_name)
+        output_name = create_image_from_rgba(rgba_data, width, height, output_name)
         
+        emit_record(file_record(filename, output_name, seconds=time.perf_counter() - start, format=format_type,
+                                width=width, height=height, input_bytes=len(data),
+                                output_bytes=os.path.getsize(output_name)))
         return True
     
     except Exception as e:
-        print(f"✗ Error converting {filename}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("✗ Error converting %s: %s", filename, e)
+        logger.debug("Traceback:", exc_info=True)
+        emit_record(file_record(filename, output_name, status="error", error=e,
+                                seconds=time.perf_counter() - start, format=format_type))
         return False
 
 
+# Stages recorded by --profile: function name -> (stage name, bytes processed).
+# "OVG decode" covers both formats; the nested "RLE decode" and "dimension
+# inference" stages are timed inside ovg_codec.decode_ovg. detect_file_format
+# and decode_rle_ovg_file are covered by their file read and in-memory stages,
+# so they aren't wrapped separately.
+PROFILED_STAGES = {
+    'read_file': ("file read", result_length_of),
+    'write_file': ("file write", lambda args, kwargs, result: len(args[1])),
+    'detect_data_format': ("format detection", length_of),
+    'decode_rle_ovg_data': ("RLE decode", length_of),
+    'decode_ovg_data': ("OVG decode", length_of),
+    'auto_detect_dimensions': ("dimension inference", lambda args, kwargs, result: args[0] * 4),
+    'encode_image_from_rgba': ("image encode", length_of),
+    'create_image_from_rgba': ("image create + write", length_of),
+    'pack_pixels': ("bundle compress", length_of),
+}
 
 if __name__ == "__main__":
     import sys
     import argparse
+    from batch_pipeline import positive_int_argument
     
     parser = argparse.ArgumentParser(description='Convert OVG files to PNG format')
     parser.add_argument('input', help='Input OVG file path')
@@ -424,11 +524,21 @@ if __name__ == "__main__":
     parser.add_argument('--width-step', type=int, default=1, 
                        help='Width step for discovery (default: 1)')
     parser.add_argument('-v', '--verbose', action='store_true',
-                       help='Show dimension detection details')
+                       help='Show dimension detection details and error tracebacks')
     parser.add_argument('--pattern', default='*.bin',
                        help='File pattern for directory conversion (default: *.bin)')
     parser.add_argument('--output-dir', 
                        help='Output directory (required when input is a directory)')
+    parser.add_argument('--pipeline', action='store_true',
+                       help='Overlap file I/O with decoding for directory conversion')
+    parser.add_argument('--queue-size', type=positive_int_argument, default=4,
+                       help='Files buffered between pipeline stages (default: 4)')
+    parser.add_argument('--bundle', metavar='FILE',
+                       help='Write a directory into one asset bundle instead of separate PNGs')
+    parser.add_argument('--bundle-level', type=int, default=6, choices=range(10), metavar='0-9',
+                       help='zlib level for bundle entries, 0 stores them uncompressed (default: 6)')
+    add_profile_arguments(parser)
+    add_output_arguments(parser)
     
     # Handle the case where no arguments are provided
     if len(sys.argv) == 1:
@@ -438,16 +548,27 @@ if __name__ == "__main__":
         print("  python3 ovg_to_png.py input.bin --width 286 --height 286")
         print("  python3 ovg_to_png.py input.bin --discover")
         print("  python3 ovg_to_png.py input_directory --output-dir output_directory")
+        print("  python3 ovg_to_png.py input_directory --bundle skin.ovgb")
         print("\nOptions:")
         print("  -w, --width WIDTH     Specify image width")
         print("  --height HEIGHT       Specify image height") 
         print("  -d, --discover        Interactive size discovery mode")
         print("  --output-dir DIR      Output directory (required for directory input)")
         print("  --pattern PATTERN     File pattern for directory conversion (default: *.bin)")
+        print("  --pipeline            Overlap file I/O with decoding for directory conversion")
+        print("  --queue-size N        Files buffered between pipeline stages (default: 4)")
+        print("  --bundle FILE         Write a directory into one asset bundle instead of PNGs")
+        print("  --bundle-level N      zlib level for bundle entries, 0 for none (default: 6)")
         print("  --width-min MIN       Minimum width for discovery (default: 35)")
         print("  --width-max MAX       Maximum width for discovery (default: 400)")
         print("  --width-step STEP     Width step for discovery (default: 1)")
-        print("  -v, --verbose         Show dimension detection details")
+        print("  -v, --verbose         Show dimension detection details and error tracebacks")
+        print("  -q, --quiet           Only print errors and the batch summary")
+        print("  --json                Write one JSON record per file to stdout")
+        print("  --profile             Print per-stage timing and bytes processed")
+        print("  --profile-json FILE   Write per-stage profile results to a JSON file")
+        print("  --cprofile FILE       Write cProfile statistics to FILE")
+        print("  --profile-memory      Also track peak memory per stage (inflates times)")
         print("\nExamples:")
         print("  # Single file conversion")
         print("  python3 ovg_to_png.py opt/gresfiles/img_off_clock_face_ovg.bin")
@@ -457,31 +578,41 @@ if __name__ == "__main__":
         print("  python3 ovg_to_png.py opt/gresfiles --output-dir decoded_images")
         print("  python3 ovg_to_png.py input_dir --output-dir output_dir --width 286 --height 286")
         print("  python3 ovg_to_png.py input_dir --output-dir output_dir --pattern '*clock*.bin'")
+        print("  python3 ovg_to_png.py /media/usb/gresfiles --output-dir decoded_images --pipeline")
+        print("  python3 ovg_to_png.py opt/gresfiles --bundle skin.ovgb --pipeline")
+        print("  # Profiling")
+        print("  python3 ovg_to_png.py opt/gresfiles --output-dir decoded_images --profile")
         sys.exit(0)
     
     # Parse arguments
     args = parser.parse_args()
+    configure_output(args.quiet, args.json, args.verbose)
     
     # Check if input is a directory
     import os
     if os.path.isdir(args.input):
         # Directory conversion
-        if not args.output_dir:
-            print("Error: --output-dir is required when input is a directory")
+        if not args.output_dir and not args.bundle:
+            logger.error("Error: --output-dir or --bundle is required when input is a directory")
             sys.exit(1)
         if args.discover:
-            print("Error: Discovery mode is not supported for directory conversion")
+            logger.error("Error: Discovery mode is not supported for directory conversion")
             sys.exit(1)
         
-        convert_directory(args.input, args.output_dir, args.width, args.height, 
-                         args.verbose, args.pattern)
+        run_profiled(args, [sys.modules[__name__], ovg_codec], PROFILED_STAGES, convert_directory,
+                     args.input, args.output_dir, args.width, args.height, args.verbose,
+                     args.pattern, args.pipeline, args.queue_size, args.bundle, args.bundle_level)
     else:
         # Single file conversion
-        if args.output_dir:
-            print("Warning: --output-dir ignored for single file conversion")
+        if args.output_dir or args.bundle:
+            logger.warning("Warning: --output-dir and --bundle are ignored for single file conversion")
         
         if args.discover:
             rgba_data, totalPixels = decode_ovg_file(args.input)
             discover_image_size(rgba_data, totalPixels, args.width_min, args.width_max, args.width_step)
         else:
-            convert_single_file(args.input, args.output, args.width, args.height, verbose=args.verbose)
\ No newline at end of file
+            run_profiled(args, [sys.modules[__name__], ovg_codec], PROFILED_STAGES, convert_single_file,
+                         args.input, args.output, args.width, args.height,
+                         verbose=args.verbose)
+    
+    flush_records()
\ No newline at end of file
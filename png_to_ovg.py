@@ -1,124 +1,58 @@
 #!/usr/bin/env python3
-import struct
-from PIL import Image
+import io
+import time
+from PIL import Image, UnidentifiedImageError
+import ovg_codec
+from ovg_codec import encode_ovg, image_rgba_view, resolve_output_format, compress_rgba_data, encode_rle_command
+from asset_bundle import AssetBundle, is_bundle
+from conversion_log import (logger, SUMMARY, add_output_arguments, configure_output, emit_record, flush_records,
+                            file_record, report_batch_summary, read_file, write_file)
+from profiling import add_profile_arguments, run_profiled, length_of, result_length_of
 
-def encode_rle_command(is_compressed, pixel_count):
-    """Encode RLE command byte"""
-    # Pixel count is stored as count-1 (0-127 range for 1-128 pixels)
-    count_bits = pixel_count - 1
-    if count_bits > 127:
-        raise ValueError(f"Too many pixels in run: {pixel_count} (max 128)")
-    
-    if is_compressed:
-        # Set MSB to 1 for compressed
-        command = 0x80 | count_bits
-    else:
-        # MSB is 0 for uncompressed
-        command = count_bits
-    
-    return command
-
-def compress_rgba_data(rgba_data):
-    """Compress RGBA data using RLE compression"""
-    if len(rgba_data) % 4 != 0:
-        raise ValueError("RGBA data length must be multiple of 4")
-    
-    compressed = bytearray()
-    i = 0
-    
-    while i < len(rgba_data):
-        # Get current pixel
-        current_pixel = rgba_data[i:i+4]
-        run_length = 1
-        
-        # Check how many consecutive identical pixels we have
-        j = i + 4
-        while j < len(rgba_data) and run_length < 128:
-            if rgba_data[j:j+4] == current_pixel:
-                run_length += 1
-                j += 4
-            else:
-                break
-        
-        # Decide whether to use RLE compression
-        if run_length >= 3:  # Compress runs of 3 or more
-            # Write compressed run
-            while run_length > 0:
-                current_run = min(run_length, 128)
-                command = encode_rle_command(True, current_run)
-                compressed.append(command)
-                compressed.extend(current_pixel)
-                run_length -= current_run
-        else:
-            # Write uncompressed pixels
-            # Look ahead to see how many non-repeating pixels we have
-            uncompressed_count = 1
-            k = i + 4
-            
-            while k < len(rgba_data) and uncompressed_count < 128:
-                next_pixel = rgba_data[k:k+4]
-                
-                # Check if next pixel starts a run of 3+
-                consecutive = 1
-                for l in range(k + 4, min(len(rgba_data), k + 12), 4):
-                    if rgba_data[l:l+4] == next_pixel:
-                        consecutive += 1
-                    else:
-                        break
-                
-                if consecutive >= 3:
-                    break  # Stop uncompressed run, let RLE handle the repetition
-                
-                uncompressed_count += 1
-                k += 4
-            
-            # Write uncompressed run
-            command = encode_rle_command(False, uncompressed_count)
-            compressed.append(command)
-            
-            for p in range(uncompressed_count):
-                pixel_offset = i + (p * 4)
-                compressed.extend(rgba_data[pixel_offset:pixel_offset+4])
-            
-            i = k
-            continue
-        
-        i = j
+def convert_directory(directory_path, output_directory, file_pattern="*.png", pipelined=False, queue_size=4):
+    """Convert all PNG files in a directory to OVG format
     
-    return compressed
-
-def convert_directory(directory_path, output_directory, file_pattern="*.png"):
-    """Convert all PNG files in a directory to OVG format"""
+    directory_path may also be an asset bundle written by ovg_to_png.py --bundle;
+    every asset in it is then re-encoded and file_pattern is not used.
+    """
     import os
     import glob
     
-    if not os.path.isdir(directory_path):
-        print(f"Error: {directory_path} is not a directory")
+    bundle_input = os.path.isfile(directory_path) and is_bundle(directory_path)
+    if not bundle_input and not os.path.isdir(directory_path):
+        logger.error("Error: %s is not a directory or asset bundle", directory_path)
         return False
     
     # Create output directory if it doesn't exist
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
-        print(f"Created output directory: {output_directory}")
+        logger.info("Created output directory: %s", output_directory)
     elif not os.path.isdir(output_directory):
-        print(f"Error: {output_directory} exists but is not a directory")
+        logger.error("Error: %s exists but is not a directory", output_directory)
         return False
     
+    if bundle_input:
+        return convert_bundle(directory_path, output_directory, pipelined, queue_size)
+    
     # Find all matching files
     search_pattern = os.path.join(directory_path, file_pattern)
     files = glob.glob(search_pattern)
     
     if not files:
-        print(f"No files matching '{file_pattern}' found in {directory_path}")
+        logger.error("No files matching '%s' found in %s", file_pattern, directory_path)
         return False
     
-    print(f"Found {len(files)} files to convert in {directory_path}")
-    print(f"Output directory: {output_directory}")
+    logger.info("Found %d files to convert in %s", len(files), directory_path)
+    logger.info("Output directory: %s", output_directory)
+    
+    if pipelined:
+        return convert_files_pipelined(sorted(files), output_directory, queue_size)
+    
     success_count = 0
     
     for file_path in sorted(files):
         try:
-            print(f"\n--- Converting {os.path.basename(file_path)} ---")
+            logger.info("\n--- Converting %s ---", os.path.basename(file_path))
             
             # Generate output filename in the output directory
             base_name = os.path.splitext(os.path.basename(file_path))[0]
@@ -128,70 +62,236 @@ def convert_directory(directory_path, output_directory, file_pattern="*.png"):
             if png_to_ovg(file_path, output_path):
                 success_count += 1
         except Exception as e:
-            print(f"✗ Failed to convert {file_path}: {e}")
+            logger.error("✗ Failed to convert %s: %s", file_path, e)
+    
+    report_batch_summary(success_count, len(files))
+    return success_count > 0
+
+def load_png_rgba(png_source):
+    """Load a PNG (filename or file object) as raw RGBA data
+    
+    Returns (rgba_data, width, height).
+    """
+    try:
+        image = Image.open(png_source)
+    except UnidentifiedImageError:
+        # PIL names the file object in its message, which means nothing for in-memory data
+        raise ValueError("not a readable image file")
+    
+    rgba_data, width, height = image_rgba_view(image)
+    logger.info("Image dimensions: %dx%d", width, height)
+    logger.info("Raw RGBA data: %d bytes (%d pixels)", len(rgba_data), len(rgba_data)//4)
+    
+    return rgba_data, width, height
+
+def encode_rgba_to_ovg(rgba_data, format_type="auto"):
+    """Encode raw RGBA data as OVG file contents
+    
+    Returns (ovg_data, format_type) with format_type resolved to "rle" or "raw_rgba".
+    """
+    format_type = resolve_output_format(len(rgba_data) // 4, format_type)
+    ovg_data = encode_ovg(rgba_data, mode=format_type)
+    
+    if format_type == "raw_rgba":
+        logger.info("Output format: raw RGBA")
+    else:
+        logger.info("Output format: RLE compressed")
+        logger.info("Compressed data: %d bytes", len(ovg_data))
+        if ovg_data:
+            logger.info("Compression ratio: %.2f:1", len(rgba_data)/len(ovg_data))
+    
+    return ovg_data, format_type
+
+def format_label(format_type):
+    """Human-readable label for an OVG output format"""
+    return "raw RGBA" if format_type == "raw_rgba" else "RLE compressed"
+
+def convert_files_pipelined(files, output_directory, queue_size=4):
+    """Convert PNG files with overlapping read, decode, encode and write stages"""
+    import os
+    from batch_pipeline import run_pipeline, report_finished_jobs, print_stage_report
+    
+    def read_stage(job):
+        job['start'] = time.perf_counter()
+        job['data'] = read_file(job['input'])
+        job['input_bytes'] = len(job['data'])
+    
+    def decode_stage(job):
+        logger.info("\n--- Converting %s ---", os.path.basename(job['input']))
+        job['rgba'], job['width'], job['height'] = load_png_rgba(io.BytesIO(job.pop('data')))
+    
+    def encode_stage(job):
+        job['ovg'], job['format'] = encode_rgba_to_ovg(job.pop('rgba'))
+    
+    def write_stage(job):
+        ovg_data = job.pop('ovg')
+        write_file(job['output'], ovg_data)
+        job['output_bytes'] = len(ovg_data)
+        job['seconds'] = time.perf_counter() - job['start']
+        logger.info("✓ Created %s (%s)", job['output'], format_label(job['format']))
+    
+    jobs = [{'input': file_path,
+             'output': os.path.join(output_directory, os.path.splitext(os.path.basename(file_path))[0] + ".bin")}
+            for file_path in files]
+    stages = [("read", read_stage), ("decode", decode_stage), ("encode", encode_stage), ("write", write_stage)]
+    finished, stats, wall_time = run_pipeline(jobs, stages, queue_size=queue_size)
+    
+    success_count = report_finished_jobs(finished)
+    report_batch_summary(success_count, len(files))
+    print_stage_report(stats, wall_time)
+    return success_count > 0
+
+# Encoder mode that reproduces each bundle entry's source format
+BUNDLE_ENCODE_MODES = {'raw_rgba': 'raw_rgba', 'rle_ovg': 'rle'}
+
+def convert_bundle(bundle_file, output_directory, pipelined=False, queue_size=4):
+    """Re-encode every asset in a bundle to an OVG file named after the entry
+    
+    Each asset is written under its original name in the format it was decoded
+    from, so the output decodes to the same pixels as the files that went into
+    ovg_to_png.py --bundle. RLE files are re-compressed by our encoder, so they
+    are not byte-identical to the originals.
+    """
+    import os
+    from batch_pipeline import run_pipeline, run_serial, report_finished_jobs, print_stage_report
+    
+    try:
+        bundle = AssetBundle(bundle_file)
+    except (OSError, ValueError) as e:
+        logger.error("Error: cannot open bundle %s: %s", bundle_file, e)
+        return False
+    
+    def read_stage(job):
+        job['start'] = time.perf_counter()
+        job['rgba'], job['width'], job['height'] = bundle.read(job['bundle_entry'])
+        job['input_bytes'] = job['bundle_entry'].stored_length
+    
+    def encode_stage(job):
+        logger.info("\n--- Converting %s ---", job['entry'])
+        mode = BUNDLE_ENCODE_MODES.get(job['bundle_entry'].format_type, 'auto')
+        job['ovg'], job['format'] = encode_rgba_to_ovg(job.pop('rgba'), mode)
+    
+    def write_stage(job):
+        ovg_data = job.pop('ovg')
+        write_file(job['output'], ovg_data)
+        job['output_bytes'] = len(ovg_data)
+        job['seconds'] = time.perf_counter() - job['start']
+        logger.info("✓ Created %s (%s)", job['output'], format_label(job['format']))
+    
+    with bundle:
+        logger.info("Found %d assets to convert in %s", len(bundle), bundle_file)
+        logger.info("Output directory: %s", output_directory)
+        
+        # Entry names come from the file; never let them point outside the output directory
+        jobs = [{'input': bundle_file, 'entry': entry.name, 'bundle_entry': entry,
+                 'output': os.path.join(output_directory, os.path.basename(entry.name))}
+                for entry in bundle]
+        stages = [("read", read_stage), ("encode", encode_stage), ("write", write_stage)]
+        if pipelined:
+            finished, stats, wall_time = run_pipeline(jobs, stages, queue_size=queue_size)
+        else:
+            finished = run_serial(jobs, stages)
+        for job in finished:
+            job.pop('rgba', None)
     
-    print(f"\n✅ Successfully converted {success_count}/{len(files)} files")
+    success_count = report_finished_jobs(finished)
+    report_batch_summary(success_count, len(finished))
+    if pipelined:
+        print_stage_report(stats, wall_time)
     return success_count > 0
 
+def watch_directory(watch_dir, output_directory, file_pattern="*.png", format_type="auto", workers=2,
+                    debounce=0.3, force_polling=False):
+    """Re-encode PNGs to OVG whenever they change, until interrupted
+    
+    PNGs that are newer than their .bin (or have none) are converted on start-up,
+    then only files that change are re-encoded.
+    """
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+    from directory_watch import create_watcher, list_matching, DebouncedWatcher, InotifyWatcher
+    
+    if not os.path.isdir(watch_dir):
+        logger.error("Error: %s is not a directory", watch_dir)
+        return False
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+        logger.info("Created output directory: %s", output_directory)
+    
+    def output_path(png_file):
+        base_name = os.path.splitext(os.path.basename(png_file))[0]
+        return os.path.join(output_directory, f"{base_name}.bin")
+    
+    watcher = create_watcher(watch_dir, file_pattern, force_polling)
+    method = "inotify" if isinstance(watcher, InotifyWatcher) else "polling"
+    logger.log(SUMMARY, "Watching %s for '%s' changes (%s) -> %s", watch_dir, file_pattern, method, output_directory)
+    
+    # Files being converted right now; a change during conversion re-queues the file
+    in_flight = {}
+    
+    def submit(pool, png_file):
+        if png_file in in_flight and not in_flight[png_file].done():
+            debounced.pending[png_file] = time.monotonic()
+            return
+        in_flight[png_file] = pool.submit(png_to_ovg, png_file, output_path(png_file), format_type)
+    
+    debounced = DebouncedWatcher(watcher, debounce)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for png_file in sorted(list_matching(watch_dir, file_pattern)):
+                target = output_path(png_file)
+                if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(png_file):
+                    submit(pool, png_file)
+            
+            while True:
+                for png_file in sorted(debounced.wait()):
+                    if os.path.exists(png_file):
+                        submit(pool, png_file)
+                in_flight = {path: future for path, future in in_flight.items() if not future.done()}
+                flush_records()
+    except KeyboardInterrupt:
+        logger.log(SUMMARY, "Stopped watching %s", watch_dir)
+    finally:
+        debounced.close()
+    return True
+
 def png_to_ovg(png_file, ovg_file, format_type="auto"):
     """Convert PNG file to OVG format"""
-    print(f"Converting {png_file} -> {ovg_file}")
+    import os
+    
+    logger.info("Converting %s -> %s", png_file, ovg_file)
+    start = time.perf_counter()
     
     # Load PNG image
     try:
-        image = Image.open(png_file)
-        
-        # Convert to RGBA if not already
-        if image.mode != 'RGBA':
-            image = image.convert('RGBA')
-        
-        width, height = image.size
-        print(f"Image dimensions: {width}x{height}")
-        
-        # Get raw RGBA data
-        rgba_data = image.tobytes('raw', 'RGBA')
-        print(f"Raw RGBA data: {len(rgba_data)} bytes ({len(rgba_data)//4} pixels)")
-        
-        # Determine output format
-        if format_type == "auto":
-            # Check if dimensions suggest raw RGBA format
-            import math
-            pixels = len(rgba_data) // 4
-            side = int(math.sqrt(pixels))
-            if side * side == pixels or (side * (side + 1)) == pixels or ((side + 1) * side) == pixels:
-                if pixels < 4000:  # Small images likely to be raw RGBA
-                    format_type = "raw_rgba"
-                else:
-                    format_type = "rle"
-            else:
-                format_type = "rle"
+        png_data = read_file(png_file)
+        rgba_data, width, height = load_png_rgba(io.BytesIO(png_data))
+        ovg_data, format_type = encode_rgba_to_ovg(rgba_data, format_type)
         
-        if format_type == "raw_rgba":
-            # Write raw RGBA data directly
-            print(f"Output format: raw RGBA")
-            with open(ovg_file, 'wb') as f:
-                f.write(rgba_data)
-            print(f"✓ Created {ovg_file} (raw RGBA)")
-        else:
-            # Compress using RLE
-            print(f"Output format: RLE compressed")
-            compressed_data = compress_rgba_data(rgba_data)
-            print(f"Compressed data: {len(compressed_data)} bytes")
-            print(f"Compression ratio: {len(rgba_data)/len(compressed_data):.2f}:1")
-            
-            # Write OVG file
-            with open(ovg_file, 'wb') as f:
-                f.write(compressed_data)
-            print(f"✓ Created {ovg_file} (RLE compressed)")
+        # Write OVG file
+        write_file(ovg_file, ovg_data)
+        logger.info("✓ Created %s (%s)", ovg_file, format_label(format_type))
         
+        emit_record(file_record(png_file, ovg_file, seconds=time.perf_counter() - start, format=format_type,
+                                width=width, height=height, input_bytes=len(png_data),
+                                output_bytes=len(ovg_data)))
         return True
-        
+    
     except Exception as e:
-        print(f"✗ Error converting {png_file}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("✗ Error converting %s: %s", png_file, e)
+        logger.debug("Traceback:", exc_info=True)
+        emit_record(file_record(png_file, ovg_file, status="error", error=e,
+                                seconds=time.perf_counter() - start))
         return False
 
+# Stages recorded by --profile: function name -> (stage name, bytes processed)
+PROFILED_STAGES = {
+    'read_file': ("file read", result_length_of),
+    'write_file': ("file write", lambda args, kwargs, result: len(args[1])),
+    'load_png_rgba': ("PNG decode", result_length_of),
+    'encode_rgba_to_ovg': ("OVG encode", length_of),
+    'compress_rgba_data': ("RLE compress", length_of),
+}
 
 def test_roundtrip(ovg_file=None):
     """Test the roundtrip conversion (OVG->PNG->OVG)"""
@@ -233,16 +333,30 @@ def test_roundtrip(ovg_file=None):
 if __name__ == "__main__":
     import sys
     import argparse
+    from batch_pipeline import positive_int_argument
     import os
     
     parser = argparse.ArgumentParser(description='Convert PNG files to OVG format')
-    parser.add_argument('input', help='Input PNG file or directory path')
+    parser.add_argument('input', nargs='?', help='Input PNG file, directory or asset bundle')
     parser.add_argument('output', nargs='?', help='Output OVG file path (for single file) or use --output-dir for directories')
-    parser.add_argument('--output-dir', help='Output directory (required when input is a directory)')
+    parser.add_argument('--output-dir', help='Output directory (required when input is a directory or bundle)')
     parser.add_argument('--pattern', default='*.png', help='File pattern for directory conversion (default: *.png)')
     parser.add_argument('--format', choices=['auto', 'rle', 'raw_rgba'], default='auto', 
                        help='Output format: auto (default), rle, or raw_rgba')
     parser.add_argument('--test', action='store_true', help='Test roundtrip conversion')
+    parser.add_argument('--pipeline', action='store_true',
+                       help='Overlap file I/O with encoding for directory conversion')
+    parser.add_argument('--queue-size', type=positive_int_argument, default=4,
+                       help='Files buffered between pipeline stages (default: 4)')
+    add_profile_arguments(parser)
+    add_output_arguments(parser)
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show error tracebacks')
+    parser.add_argument('--watch', metavar='DIR', help='Re-encode PNGs in DIR whenever they change')
+    parser.add_argument('--debounce', type=float, default=0.3,
+                       help='Seconds a file must be quiet before it is re-encoded (default: 0.3)')
+    parser.add_argument('--workers', type=positive_int_argument, default=2,
+                       help='Encoder threads in watch mode (default: 2)')
+    parser.add_argument('--poll', action='store_true', help='Poll for changes instead of using inotify')
     
     # Handle the case where no arguments are provided
     if len(sys.argv) == 1:
@@ -251,12 +365,27 @@ if __name__ == "__main__":
         print("  python3 png_to_ovg.py input.png [output.bin]")
         print("  python3 png_to_ovg.py input.png  # Auto-generate output name")
         print("  python3 png_to_ovg.py input_directory --output-dir output_directory")
+        print("  python3 png_to_ovg.py skin.ovgb --output-dir output_directory")
         print("  python3 png_to_ovg.py --test [file.bin]  # Test roundtrip conversion")
+        print("  python3 png_to_ovg.py --watch png_dir --output-dir ovg_dir")
         print("\nOptions:")
-        print("  --output-dir DIR      Output directory (required for directory input)")
+        print("  --output-dir DIR      Output directory (required for directory or bundle input)")
         print("  --pattern PATTERN     File pattern for directory conversion (default: *.png)")
         print("  --format FORMAT       Output format: auto (default), rle, or raw_rgba")
         print("  --test                Test roundtrip conversion")
+        print("  -v, --verbose         Show error tracebacks")
+        print("  -q, --quiet           Only print errors and the batch summary")
+        print("  --json                Write one JSON record per file to stdout")
+        print("  --pipeline            Overlap file I/O with encoding for directory conversion")
+        print("  --queue-size N        Files buffered between pipeline stages (default: 4)")
+        print("  --profile             Print per-stage timing and bytes processed")
+        print("  --profile-json FILE   Write per-stage profile results to a JSON file")
+        print("  --cprofile FILE       Write cProfile statistics to FILE")
+        print("  --profile-memory      Also track peak memory per stage (inflates times)")
+        print("  --watch DIR           Re-encode PNGs in DIR whenever they change")
+        print("  --debounce SECONDS    Quiet time before a changed file is re-encoded (default: 0.3)")
+        print("  --workers N           Encoder threads in watch mode (default: 2)")
+        print("  --poll                Poll for changes instead of using inotify")
         print("\nExamples:")
         print("  # Single file conversion")
         print("  python3 png_to_ovg.py my_clock.png clock_new.bin")
@@ -264,6 +393,9 @@ if __name__ == "__main__":
         print("  # Directory conversion")
         print("  python3 png_to_ovg.py decoded_images --output-dir new_ovg_files")
         print("  python3 png_to_ovg.py png_dir --output-dir ovg_dir --pattern '*clock*.png'")
+        print("  python3 png_to_ovg.py skin.ovgb --output-dir ovg_dir --pipeline")
+        print("  # Watch mode")
+        print("  python3 png_to_ovg.py --watch skin_pngs --output-dir skin_bins --format rle")
         print("  # Testing")
         print("  python3 png_to_ovg.py --test opt/gresfiles/img_off_clock_face_ovg.bin")
         sys.exit(0)
@@ -278,6 +410,7 @@ if __name__ == "__main__":
     
     # Parse arguments
     args = parser.parse_args()
+    configure_output(args.quiet, args.json, args.verbose)
     
     # Handle test mode
     if args.test:
@@ -287,24 +420,42 @@ if __name__ == "__main__":
             test_roundtrip()
         sys.exit(0)
     
-    # Check if input is a directory
-    if os.path.isdir(args.input):
+    # Watch mode
+    if args.watch:
+        if not args.output_dir:
+            logger.error("Error: --output-dir is required with --watch")
+            sys.exit(1)
+        watch_directory(args.watch, args.output_dir, args.pattern, args.format, args.workers,
+                        args.debounce, args.poll)
+        flush_records()
+        sys.exit(0)
+    
+    if not args.input:
+        parser.error("an input file or directory is required")
+    
+    # Check if input is a directory or asset bundle
+    if os.path.isdir(args.input) or is_bundle(args.input):
         # Directory conversion
         if not args.output_dir:
-            print("Error: --output-dir is required when input is a directory")
+            logger.error("Error: --output-dir is required when input is a directory or bundle")
             sys.exit(1)
         
-        convert_directory(args.input, args.output_dir, args.pattern)
+        run_profiled(args, [sys.modules[__name__], ovg_codec], PROFILED_STAGES, convert_directory,
+                     args.input, args.output_dir, args.pattern, args.pipeline, args.queue_size)
     else:
         # Single file conversion
         if args.output_dir:
-            print("Warning: --output-dir ignored for single file conversion")
+            logger.warning("Warning: --output-dir ignored for single file conversion")
         
         if args.output:
             # Explicit output filename
-            png_to_ovg(args.input, args.output, args.format)
+            run_profiled(args, [sys.modules[__name__], ovg_codec], PROFILED_STAGES, png_to_ovg,
+                         args.input, args.output, args.format)
         else:
             # Auto-generate output filename
             base_name = os.path.splitext(args.input)[0]
             ovg_file = f"{base_name}.bin"
-            png_to_ovg(args.input, ovg_file, args.format)
\ No newline at end of file
+            run_profiled(args, [sys.modules[__name__], ovg_codec], PROFILED_STAGES, png_to_ovg,
+                         args.input, ovg_file, args.format)
+    
+    flush_records()
\ No newline at end of file
@@ -1,41 +1,19 @@
 from PIL import Image 
-import numpy as np
-import operator
-import functools
+from ovg_codec import encode_rcd
 
 # RCD330 logo.bin format is raw pixel data, 8-bit RGB, in BGRX order.
 # The dimensions are 800 wide and 480 high.
 # A 3-bit checksum is appended; details are below.
+#
+# The checksum is the XOR of every blue, green, red and alpha byte, written
+# in B G R A order after the pixels. See ovg_codec.encode_rcd.
 
 # import image
 img = Image.open('logo.png')
 
-# cast to RGBA
-data = np.array(img.convert("RGBA"))
-r, g, b, a = data.T
-
-# xor all blue pixels together
-chksumBlue = functools.reduce(operator.xor, np.array([b]).transpose().flatten())
-# and green
-chksumGreen = functools.reduce(operator.xor, np.array([g]).transpose().flatten())
-# and red
-chksumRed = functools.reduce(operator.xor, np.array([r]).transpose().flatten())
-# and alpha
-chksumAlpha = functools.reduce(operator.xor, np.array([a]).transpose().flatten())
-
-# img output
-data = np.array([b, g, r, a])
-bgrData = data.transpose()
-bgrArray = bgrData.flatten()
-
 f = open('./output.bin', 'wb')
-# B G R A ordered data
-f.write(bgrArray)
-# pixel checksums
-f.write(chksumBlue)
-f.write(chksumGreen)
-f.write(chksumRed)
-f.write(chksumAlpha)
+# B G R A ordered data followed by pixel checksums
+f.write(encode_rcd(img))
 f.close()
 
 print('output.bin saved')
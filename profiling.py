@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from conversion_log import logger, SUMMARY
+
+# Per-stage timing instrumentation for the converters
+#
+# A StageProfiler wraps module-level functions (format detection, RLE decoding,
+# PNG compression, file I/O, ...) and records wall time, bytes processed and,
+# optionally, peak traced memory for every call. Because the converters call each other through
+# module globals, wrapping the global also catches internal calls. Stages nest:
+# an outer stage's time and memory include its inner stages. Reports go through
+# the converter logger, so they never mix with --json records on stdout.
+
+class StageRecord:
+    """Accumulated measurements for one named stage"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall_time = 0.0
+        self.bytes_processed = 0
+        self.peak_memory = 0
+    
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'calls': self.calls,
+            'wall_time': self.wall_time,
+            'bytes': self.bytes_processed,
+            'peak_memory': self.peak_memory,
+        }
+
+class StageProfiler:
+    """Collect wall time, bytes and peak memory per stage
+    
+    Peak memory comes from tracemalloc and is only tracked when track_memory is
+    set; it slows allocation-heavy code down many times over, so timings taken
+    with memory tracking on are inflated. tracemalloc's peak is process-wide, so
+    memory tracking is only meaningful while stages run on one thread at a time.
+    memory_note explains in the report why memory wasn't tracked.
+    """
+    
+    def __init__(self, track_memory=False, memory_note=None):
+        self.track_memory = track_memory
+        self.memory_note = memory_note
+        self.records = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+    
+    def start(self):
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    def stop(self):
+        if self.track_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    
+    def stage_stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+    
+    def begin(self, name):
+        """Open a stage; returns a frame to pass to end()"""
+        stack = self.stage_stack()
+        frame = {'name': name, 'start': time.perf_counter(), 'base': 0, 'peak': 0}
+        if self.track_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # Fold the peak seen so far into the enclosing stage before resetting
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['base'] = current
+        stack.append(frame)
+        return frame
+    
+    def end(self, frame, nbytes=0):
+        """Close a stage opened with begin() and record its measurements"""
+        elapsed = time.perf_counter() - frame['start']
+        stack = self.stage_stack()
+        stack.pop()
+        
+        peak_memory = 0
+        if self.track_memory and tracemalloc.is_tracing():
+            peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+            peak_memory = max(0, peak - frame['base'])
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        
+        with self.lock:
+            record = self.records.get(frame['name'])
+            if record is None:
+                record = self.records[frame['name']] = StageRecord(frame['name'])
+            record.calls += 1
+            record.wall_time += elapsed
+            record.bytes_processed += nbytes
+            record.peak_memory = max(record.peak_memory, peak_memory)
+    
+    def wrap(self, func, stage_name, bytes_of=None):
+        """Return func wrapped so each call is recorded under stage_name
+        
+        bytes_of(args, kwargs, result) returns the number of bytes the call
+        processed; it is only evaluated for calls that succeed.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            frame = self.begin(stage_name)
+            nbytes = 0
+            try:
+                result = func(*args, **kwargs)
+                if bytes_of is not None:
+                    try:
+                        nbytes = bytes_of(args, kwargs, result)
+                    except Exception:
+                        nbytes = 0
+                return result
+            finally:
+                self.end(frame, nbytes)
+        return wrapper
+    
+    def instrument(self, module, stages):
+        """Wrap module functions in place
+        
+        stages maps a function name to (stage name, bytes_of) and replaces the
+        module global, so calls from inside the module are recorded too.
+        """
+        for func_name, (stage_name, bytes_of) in stages.items():
+            func = getattr(module, func_name, None)
+            if func is not None:
+                setattr(module, func_name, self.wrap(func, stage_name, bytes_of))
+    
+    def results(self):
+        """Stage records ordered by total wall time, slowest first"""
+        with self.lock:
+            return sorted(self.records.values(), key=lambda record: record.wall_time, reverse=True)
+    
+    def print_report(self, total_time=None):
+        """Log a per-stage table of wall time, throughput and peak memory"""
+        logger.log(SUMMARY, "\nProfile (stages nest, so times overlap):")
+        logger.log(SUMMARY, f"  {'Stage':<22} {'Calls':>6} {'Time':>9} {'Bytes':>12} {'MB/s':>8} {'Peak mem':>10}")
+        for record in self.results():
+            throughput = record.bytes_processed / record.wall_time / 1e6 if record.wall_time > 0 else 0.0
+            peak = format_size(record.peak_memory) if self.track_memory else "-"
+            logger.log(SUMMARY, f"  {record.name:<22} {record.calls:>6} {record.wall_time:>8.3f}s "
+                       f"{record.bytes_processed:>12} {throughput:>8.1f} {peak:>10}")
+        if total_time is not None:
+            logger.log(SUMMARY, "  Total run time: %.3fs", total_time)
+        if self.track_memory:
+            logger.log(SUMMARY, "  Note: times are inflated by peak memory tracking; "
+                       "profile without --profile-memory for accurate timings")
+        if self.memory_note:
+            logger.log(SUMMARY, "  Note: %s", self.memory_note)
+    
+    def write_json(self, output_file, total_time=None):
+        """Write the stage records to a JSON file"""
+        report = {
+            'total_time': total_time,
+            'memory_tracked': self.track_memory,
+            'memory_note': self.memory_note,
+            'stages': [record.as_dict() for record in self.results()],
+        }
+        with open(output_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.log(SUMMARY, "✓ Wrote profile: %s", output_file)
+
+def format_size(nbytes):
+    """Human-readable byte count"""
+    for unit in ["B", "KB", "MB"]:
+        if nbytes < 1024:
+            return f"{nbytes:.0f}{unit}" if unit == "B" else f"{nbytes:.1f}{unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f}GB"
+
+def length_of(args, kwargs, result):
+    """bytes_of helper: length of the first argument"""
+    return len(args[0])
+
+def result_length_of(args, kwargs, result):
+    """bytes_of helper: length of the returned data (or its first element)"""
+    if isinstance(result, tuple):
+        result = result[0]
+    return len(result)
+
+def add_profile_arguments(parser):
+    """Add the --profile family of options to an argparse parser"""
+    parser.add_argument('--profile', action='store_true',
+                       help='Print per-stage timing and bytes processed')
+    parser.add_argument('--profile-json', metavar='FILE',
+                       help='Write per-stage profile results to a JSON file')
+    parser.add_argument('--cprofile', metavar='FILE',
+                       help='Write cProfile statistics to FILE (view with python3 -m pstats)')
+    parser.add_argument('--profile-memory', action='store_true',
+                       help='Also track peak memory per stage (slows allocation-heavy stages, '
+                            'so times are inflated)')
+
+def run_profiled(args, modules, stages, func, *func_args, **func_kwargs):
+    """Call func, instrumenting stages in each module if profiling options were given"""
+    if not (args.profile or args.profile_json or args.cprofile):
+        return func(*func_args, **func_kwargs)
+    
+    profiler = None
+    if args.profile or args.profile_json:
+        track_memory = args.profile_memory
+        memory_note = None
+        if track_memory and getattr(args, 'pipeline', False):
+            # Pipeline stages run on concurrent threads and would reset each other's peaks
+            track_memory = False
+            memory_note = "peak memory is not tracked with --pipeline (tracemalloc peaks are process-wide)"
+        profiler = StageProfiler(track_memory, memory_note)
+        for module in modules:
+            profiler.instrument(module, stages)
+        profiler.start()
+    
+    cprofiler = None
+    if args.cprofile:
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+    
+    start = time.perf_counter()
+    try:
+        return func(*func_args, **func_kwargs)
+    finally:
+        total_time = time.perf_counter() - start
+        if cprofiler is not None:
+            cprofiler.disable()
+            cprofiler.dump_stats(args.cprofile)
+            logger.log(SUMMARY, "✓ Wrote cProfile stats: %s", args.cprofile)
+        if profiler is not None:
+            profiler.stop()
+            if args.profile:
+                profiler.print_report(total_time)
+            if args.profile_json:
+                profiler.write_json(args.profile_json, total_time)
@@ -1,4 +1,5 @@
 from PIL import Image
+from ovg_codec import decode_rcd
 
 # RCD330 logo.bin format is raw pixel data, 8-bit RGB, in BGRX order.
 # The dimensions are 800 wide and 480 high.
@@ -11,7 +12,8 @@ height = 480
 # let's go!
 in_file = open(filename, "rb")  # opening for [r]eading as [b]inary
 data = in_file.read() 
-img = Image.frombytes('RGBA', (width, height), data, 'raw', 'BGRA')
+rgba_data, width, height = decode_rcd(data, width, height)
+img = Image.frombytes('RGBA', (width, height), bytes(rgba_data), 'raw', 'RGBA')
 output = "logo.png"
 img.save(output)
 print(output + ' saved')